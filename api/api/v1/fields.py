@@ -0,0 +1,57 @@
+from functools import lru_cache
+from http import HTTPStatus
+from typing import List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, create_model
+
+import core.messages as messages
+
+
+# Разреженные ответы: fields=title,imdb_rating. uuid есть в ответе всегда -
+# по нему строятся теги кэша и собираются batch-ответы
+ID_FIELD = "uuid"
+FIELDS_SEPARATOR = ","
+FIELDS_DESCRIPTION = "Поля ответа через запятую (по умолчанию - все); uuid возвращается всегда"
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """fields=title,imdb_rating -> поля model в порядке модели; None - все поля.
+
+    Raises:
+        HTTPException: 400, если поля нет в модели ответа
+    """
+    requested = {
+        name.strip() for name in (fields or "").split(FIELDS_SEPARATOR) if name.strip()
+    }
+    if not requested:
+        return None
+    unknown = requested - model.__fields__.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"{messages.INVALID_FIELDS}: {', '.join(sorted(unknown))}"
+        )
+    requested.add(ID_FIELD)
+    return [name for name in model.__fields__ if name in requested]
+
+
+@lru_cache(maxsize=None)  # наборов полей конечное число: подмножества полей модели
+def _sparse_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    definitions = {}
+    for name in fields:
+        field = model.__fields__[name]
+        field_type = Optional[field.outer_type_] if field.allow_none else field.outer_type_
+        definitions[name] = (field_type, ... if field.required else field.default)
+    sparse = create_model(
+        f"{model.__name__}Fields", __config__=model.__config__, **definitions
+    )
+    sparse.cache_tag = getattr(model, "cache_tag", None)
+    return sparse
+
+
+def sparse_model(model: Type[BaseModel], fields: Optional[List[str]]) -> Type[BaseModel]:
+    """Модель ответа только с выбранными полями (теги кэша - как у model)."""
+    if fields is None:
+        return model
+    return _sparse_model(model, tuple(fields))
@@ -1,44 +1,139 @@
 from http import HTTPStatus
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import parse_obj_as
 
-from core.view_decorators import url_cache
+from core import config
+from core.view_decorators import (
+    batch_response,
+    cached_batch,
+    parse_batch_ids,
+    url_cache,
+)
 from services.films import get_service
-from services.mixins import GetByIDService, ListService, SearchService
-from api.v1.response_models import Film, FilmSummary
+from services.genres import GenreCatalog, get_genre_catalog
+from services.mixins import (
+    GetByIDService,
+    GetManyByIDService,
+    ListService,
+    SearchService,
+    SuggestService,
+    source_fields,
+)
+from api.v1.fields import FIELDS_DESCRIPTION, parse_fields, sparse_model
+from api.v1.pagination import set_page_headers
+from api.v1.response_models import Film, FilmBatch, FilmSummary
 
 import core.messages as messages
 
 router = APIRouter()
 
-
 @router.get(
     "/",
     response_model=List[FilmSummary],
     summary="Получение списка кинопроизведений",
-    description="Постраничный список известных сервису кинопроизведений в краткой форме",
+    description="Постраничный список известных сервису кинопроизведений в краткой форме. "
+                "Для глубокого пролистывания передавайте page[cursor] из заголовка "
+                "X-Next-Cursor предыдущей страницы. Число найденных и признак "
+                "следующей страницы - в X-Total-Count/X-Total-Relation и X-Has-More",
     response_description="Название, идентификатор и IMDB-рейтинг фильма",
     tags=['Список кинопроизведений']
 )
-@url_cache(expire=60)
+@url_cache(expire=60, stale=300)
 async def films(
     sort: Optional[str] = Query(None),
     filter_genre: Optional[str] = Query(None, alias="filter[genre]"),
     page: Optional[int] = Query(1, alias="page[number]"),
     size: Optional[int] = Query(50, alias="page[size]"),
+    cursor: Optional[str] = Query(None, alias="page[cursor]"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     film_service: ListService = Depends(get_service),
+    genres: GenreCatalog = Depends(get_genre_catalog),
+    response: Response = None,
 ) -> List[FilmSummary]:
-    films = await film_service.list(
-        page_number=size, page_size=page, sort=sort, filter_genre=filter_genre
-    )
-    if not films:
+    selected = parse_fields(fields, FilmSummary)
+    # неизвестный жанр отсекаем по каталогу, не спрашивая ES
+    if filter_genre and await genres.ready() and genres.get(filter_genre) is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail=messages.GENRE_NOT_FOUND
+        )
+    try:
+        films = await film_service.list(
+            page_number=page,
+            page_size=size,
+            sort=sort,
+            filter_genre=filter_genre,
+            cursor=cursor,
+            fields=selected or source_fields(FilmSummary)
+        )
+    except ValueError as exc:  # курсор или сортировка не разобраны
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(exc)
+        )
+    if not films or not films.items:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail=messages.FILMS_NOT_FOUND
         )
-    return parse_obj_as(List[FilmSummary], films)
+    set_page_headers(response, films)
+    return parse_obj_as(List[sparse_model(FilmSummary, selected)], films.items)
+
+
+@router.get(
+    "/suggest",
+    response_model=List[FilmSummary],
+    summary="Подсказки при вводе поискового запроса",
+    description="Кинопроизведения, название которых или слово в нём начинается с prefix. "
+                "Рассчитано на запрос при каждом нажатии клавиши: ответ короткий и кэшируется",
+    response_description="Идентификатор фильма, название, и IMDB-рейтинг",
+    tags=['Поиск кинопроизведения']
+)
+@url_cache(expire=300, stale=3600)
+async def suggest_films(
+    prefix: str = Query(..., min_length=1),
+    size: int = Query(config.SUGGEST_DEFAULT_SIZE, ge=1, le=config.SUGGEST_MAX_SIZE),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    film_service: SuggestService = Depends(get_service)
+) -> List[FilmSummary]:
+    selected = parse_fields(fields, FilmSummary)
+    films = await film_service.suggest(
+        prefix, size, fields=selected or source_fields(FilmSummary)
+    )
+    return parse_obj_as(List[sparse_model(FilmSummary, selected)], films)
+
+
+@router.get(
+    "/batch",
+    response_model=FilmBatch,
+    summary="Получение сведений о нескольких кинопроизведениях",
+    description="Полные сведения о кинопроизведениях по списку идентификаторов "
+                "(ids=id1,id2,...) в порядке запроса; ненайденные перечислены в not_found, "
+                "а пока хранилище недоступно, не найденные в кэше - в unavailable",
+    response_description="Кинопроизведения и идентификаторы, которых нет в сервисе",
+    tags=['Полная информация о кинопроизведении']
+)
+async def films_batch(
+    ids: List[str] = Query(...),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    film_service: GetManyByIDService = Depends(get_service),
+    request: Request = None
+) -> Response:
+    film_ids = parse_batch_ids(ids)
+    selected = parse_fields(fields, Film)
+    model = sparse_model(Film, selected)
+
+    async def fetch(missed: List[str]) -> Dict[str, Film]:
+        films = await film_service.get_many(missed, fields=selected)
+        return {film_id: model(**film.dict()) for film_id, film in films.items()}
+
+    # записи общие с film_details: одиночные запросы прогревают batch и наоборот
+    batch = await cached_batch(
+        film_details, "film_id", film_ids, fetch, params={"fields": fields}
+    )
+    return batch_response(film_ids, batch, request)
 
 
 @router.get(
@@ -50,18 +145,25 @@ async def films(
     response_description="Название, описание, IMDB-рейтинг, актеры, режиссеры, жанры",
     tags=['Полная информация о кинопроизведении']
 )
-@url_cache(expire=60)
+@url_cache(
+    expire=60,
+    not_found_expire=config.CACHE_NOT_FOUND_EXPIRE,
+    not_found_tag=("film", "film_id"),
+    fallback=config.CACHE_FALLBACK_EXPIRE
+)
 async def film_details(
     film_id: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     film_service: GetByIDService = Depends(get_service)
 ) -> Film:
-    film = await film_service.get(film_id)
+    selected = parse_fields(fields, Film)
+    film = await film_service.get(film_id, fields=selected)
     if not film:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail=messages.FILM_NOT_FOUND
         )
-    return Film(**film.dict())
+    return sparse_model(Film, selected)(**film.dict())
 
 
 @router.get(
@@ -69,25 +171,41 @@ async def film_details(
     response_model=List[FilmSummary],
     summary="Поиск кинопроизведений",
     description="Поиск кинопроизведений по указанной строке " +
-                "запроса с постраничным выводом результатов в краткой форме",
+                "запроса с постраничным выводом результатов в краткой форме " +
+                "(по номеру страницы или по page[cursor] из X-Next-Cursor). " +
+                "Число найденных и признак следующей страницы - в X-Total-Count/" +
+                "X-Total-Relation и X-Has-More",
     response_description="Идентификатор фильма, название, и IMDB-рейтинг",
     tags=['Поиск кинопроизведения']
 )
-@url_cache(expire=60)
+@url_cache(expire=60, stale=300)
 async def search_films(
     query: Optional[str] = Query(None),
     page: Optional[int] = Query(1, alias="page[number]"),
     size: Optional[int] = Query(50, alias="page[size]"),
+    cursor: Optional[str] = Query(None, alias="page[cursor]"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     film_service: SearchService = Depends(get_service),
+    response: Response = None,
 ) -> List[FilmSummary]:
-    films = await film_service.search(
-        string=query,
-        page_number=size,
-        page_size=page
-    )
-    if not films:
+    selected = parse_fields(fields, FilmSummary)
+    try:
+        films = await film_service.search(
+            string=query,
+            page_number=page,
+            page_size=size,
+            cursor=cursor,
+            fields=selected or source_fields(FilmSummary)
+        )
+    except ValueError as exc:  # курсор или сортировка не разобраны
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(exc)
+        )
+    if not films or not films.items:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail=messages.FILMS_NOT_FOUND
         )
-    return parse_obj_as(List[FilmSummary], films)
+    set_page_headers(response, films)
+    return parse_obj_as(List[sparse_model(FilmSummary, selected)], films.items)
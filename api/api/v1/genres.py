@@ -1,29 +1,47 @@
 from http import HTTPStatus
-from typing import List
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
-from services.genres import get_service
-from services.mixins import GetByIDService, ListService
+from services.genres import GenreService, get_service
 from api.v1.response_models import Genre
-from core.view_decorators import url_cache
+from core import config
+from core.view_decorators import etag_matches
 
 import core.messages as messages
 
 router = APIRouter()
 
 
+def not_modified(
+    request: Request,
+    response: Response,
+    etag: str
+) -> Optional[Response]:
+    # ETag у всех ручек жанров - версия каталога: меняется только при загрузке
+    headers: Dict[str, str] = {
+        "ETag": etag,
+        "Cache-Control": f"max-age={config.GENRE_CATALOG_MAX_AGE}",
+    }
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 @router.get(
     '/',
     response_model=List[Genre],
     summary = "Получение списка жанров",
-    description = "Полный список жанров, без разделения на страницы (жанров немного)",
+    description = "Полный список жанров, без разделения на страницы " +
+                  "(жанров немного, список отдаётся из памяти)",
     response_description = "Список из названий и идентификаторов жанров",
     tags = ['Список жанров']
 )
-@url_cache(expire=120)
 async def genres(
-    genre_service: ListService = Depends(get_service)
+    request: Request,
+    response: Response,
+    genre_service: GenreService = Depends(get_service)
 ) -> List[Genre]:
     genres_list = await genre_service.list()
     if genres_list is None:
@@ -31,7 +49,10 @@ async def genres(
             status_code=HTTPStatus.NOT_FOUND,
             detail=messages.GENRES_NOT_FOUND
         )
-    return [Genre.parse_obj(genre) for genre in genres_list]
+    return (
+        not_modified(request, response, genre_service.etag) or
+        [Genre.parse_obj(genre) for genre in genres_list]
+    )
 
 
 @router.get(
@@ -42,10 +63,11 @@ async def genres(
     response_description="Название и идентификатор жанра",
     tags=['Сведения о жанре']
 )
-@url_cache(expire=120)
 async def genre_details(
         genre_id: str,
-        genre_service: GetByIDService = Depends(get_service)
+        request: Request,
+        response: Response,
+        genre_service: GenreService = Depends(get_service)
 ) -> Genre:
     genre = await genre_service.get(genre_id)
     if genre is None:
@@ -53,4 +75,7 @@ async def genre_details(
             status_code=HTTPStatus.NOT_FOUND,
             detail=messages.GENRE_NOT_FOUND
         )
-    return Genre.parse_obj(genre)
+    return (
+        not_modified(request, response, genre_service.etag) or
+        Genre.parse_obj(genre)
+    )
@@ -0,0 +1,24 @@
+from typing import Optional
+
+from fastapi import Response
+
+from models.page import Page
+
+
+# Метаданные страницы отдаются заголовками, тело остаётся массивом;
+# url_cache хранит их вместе с записью
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_RELATION_HEADER = "X-Total-Relation"
+HAS_MORE_HEADER = "X-Has-More"
+
+
+def set_page_headers(response: Optional[Response], page: Page) -> None:
+    if response is None:
+        return
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if page.total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(page.total)
+        response.headers[TOTAL_RELATION_HEADER] = page.total_relation
+    response.headers[HAS_MORE_HEADER] = "true" if page.has_more else "false"
@@ -1,17 +1,90 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import parse_obj_as
 
+from services.films import get_service as get_film_service
 from services.persons import get_service
-from api.v1.response_models import Person, FilmSummary
-from services.mixins import GetByIDService, SearchService
-from typing import List, Optional
-from core.view_decorators import url_cache
+from api.v1.fields import FIELDS_DESCRIPTION, parse_fields, sparse_model
+from api.v1.pagination import set_page_headers
+from api.v1.response_models import Film, Person, PersonBatch, PersonSummary, FilmSummary
+from core import config
+from services.mixins import (
+    GetByIDService,
+    GetManyByIDService,
+    ListService,
+    SearchService,
+    SuggestService,
+    source_fields,
+)
+from typing import Dict, List, Optional, Union
+from core.view_decorators import (
+    batch_response,
+    cached_batch,
+    parse_batch_ids,
+    url_cache,
+)
 import core.messages as messages
 
 router = APIRouter()
 
 
+@router.get(
+    "/suggest",
+    response_model=List[PersonSummary],
+    summary="Подсказки при вводе имени персоны",
+    description="Персоны, имя или фамилия которых начинается с prefix. " +
+                "Рассчитано на запрос при каждом нажатии клавиши: ответ короткий и кэшируется",
+    response_description="Идентификатор и полное имя персоны",
+    tags=['Поиск персон']
+)
+@url_cache(expire=300, stale=3600)
+async def suggest_persons(
+    prefix: str = Query(..., min_length=1),
+    size: int = Query(config.SUGGEST_DEFAULT_SIZE, ge=1, le=config.SUGGEST_MAX_SIZE),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    person_service: SuggestService = Depends(get_service)
+) -> List[PersonSummary]:
+    selected = parse_fields(fields, PersonSummary)
+    persons = await person_service.suggest(
+        prefix, size, fields=selected or source_fields(PersonSummary)
+    )
+    return parse_obj_as(List[sparse_model(PersonSummary, selected)], persons)
+
+
+@router.get(
+    "/batch",
+    response_model=PersonBatch,
+    summary="Получение сведений о нескольких персонах",
+    description="Сведения о персонах (включая данные о фильмах) по списку идентификаторов " +
+                "(ids=id1,id2,...) в порядке запроса; ненайденные перечислены в not_found, " +
+                "а пока хранилище недоступно, не найденные в кэше - в unavailable",
+    response_description="Сведения о персонах и идентификаторы, которых нет в сервисе",
+    tags=['Сведения о персонах']
+)
+async def persons_batch(
+    ids: List[str] = Query(...),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    person_service: GetManyByIDService = Depends(get_service),
+    request: Request = None
+) -> Response:
+    person_ids = parse_batch_ids(ids)
+    selected = parse_fields(fields, Person)
+    model = sparse_model(Person, selected)
+
+    async def fetch(missed: List[str]) -> Dict[str, Person]:
+        persons = await person_service.get_many(missed, fields=selected)
+        return {
+            person_id: model.parse_obj(person)
+            for person_id, person in persons.items()
+        }
+
+    batch = await cached_batch(
+        person_details, "person_id", person_ids, fetch, params={"fields": fields}
+    )
+    return batch_response(person_ids, batch, request)
+
+
 @router.get(
     "/{person_id}",
     response_model=Person,
@@ -20,41 +93,80 @@ router = APIRouter()
     response_description="Сведения о персоне (включая данные о фильмах)",
     tags=['Сведения о персонах']
 )
-@url_cache(expire=60)
+@url_cache(
+    expire=60,
+    not_found_expire=config.CACHE_NOT_FOUND_EXPIRE,
+    not_found_tag=("person", "person_id"),
+    fallback=config.CACHE_FALLBACK_EXPIRE
+)
 async def person_details(
     person_id: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     person_service: GetByIDService = Depends(get_service)
 ) -> Person:
-    person = await person_service.get(person_id)
+    selected = parse_fields(fields, Person)
+    person = await person_service.get(person_id, fields=selected)
     if not person:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail=messages.PERSON_NOT_FOUND
         )
-    return Person.parse_obj(person)
+    return sparse_model(Person, selected).parse_obj(person)
 
 
 @router.get(
     "/{person_id}/film/",
-    response_model=List[FilmSummary],
+    response_model=List[Union[Film, FilmSummary]],
     summary="Получение данных о фильмах с участием персоны",
-    description="Возвращает все фильмы, в которых персона принимала" +
-                "участие как актер, режиссер или сценарист (без возможности постраничного вывода)",
-    response_description="Список фильмов со всей информацией",
+    description="Возвращает фильмы, в которых персона принимала " +
+                "участие как актер, режиссер или сценарист, с постраничным разбиением " +
+                "(число найденных и признак следующей страницы - в X-Total-Count/" +
+                "X-Total-Relation и X-Has-More). По умолчанию фильмы в краткой форме, " +
+                "полные сведения - с details=true",
+    response_description="Название, идентификатор и IMDB-рейтинг фильма (с details=true - все сведения)",
     tags=['Сведения о фильмах с участием персоны']
 )
-@url_cache(expire=60)
+@url_cache(
+    expire=60,
+    not_found_expire=config.CACHE_NOT_FOUND_EXPIRE,
+    not_found_tag=("person", "person_id")
+)
 async def person_films_short_summary(
     person_id: str,
-    person_service: GetByIDService = Depends(get_service)
-) -> List[FilmSummary]:
-    person = await person_service.get(person_id)
-    if person is None or len(person.film_ids) == 0:  # спекулятивно, но в одну строчку
+    details: bool = Query(False),
+    sort: Optional[str] = Query(None),
+    page: Optional[int] = Query(1, alias="page[number]"),
+    size: Optional[int] = Query(50, alias="page[size]"),
+    cursor: Optional[str] = Query(None, alias="page[cursor]"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    film_service: ListService = Depends(get_film_service),
+    response: Response = None,
+) -> List[Union[Film, FilmSummary]]:
+    model = Film if details else FilmSummary
+    selected = parse_fields(fields, model)
+    # страница фильмов - запросом к movies, а не из документа персоны:
+    # размер ответа не зависит от фильмографии
+    try:
+        films = await film_service.list(
+            page_number=page,
+            page_size=size,
+            sort=sort,
+            filter_person=person_id,
+            cursor=cursor,
+            fields=selected or (None if details else source_fields(FilmSummary))
+        )
+    except ValueError as exc:  # курсор или сортировка не разобраны
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=str(exc)
+        )
+    if not films or not films.items:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail=messages.FILMS_NOT_FOUND
         )
-    return [FilmSummary.parse_obj(film) for film in person.film_ids]
+    set_page_headers(response, films)
+    return parse_obj_as(List[sparse_model(model, selected)], films.items)
 
 
 @router.get(
@@ -62,7 +174,9 @@ async def person_films_short_summary(
     response_model=List[Person],
     summary="Поиск персон по заданой строке",
     description="Возвращает полный набор сведений персонах," +
-                "найденных по искомой строке, с постраничным разбиением",
+                "найденных по искомой строке, с постраничным разбиением " +
+                "(число найденных и признак следующей страницы - в X-Total-Count/" +
+                "X-Total-Relation и X-Has-More)",
     response_description="Сведения о найденных персонах (включая данные о фильмах)",
     tags=['Поиск персон']
 )
@@ -71,16 +185,21 @@ async def search_persons(
     query: Optional[str] = Query(None),
     page: Optional[int] = Query(1, alias="page[number]"),
     size: Optional[int] = Query(50, alias="page[size]"),
-    person_service: SearchService = Depends(get_service)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    person_service: SearchService = Depends(get_service),
+    response: Response = None,
 ) -> List[Person]:
+    selected = parse_fields(fields, Person)
     persons = await person_service.search(
         search_text=query,
         page_number=page,
-        page_size=size
+        page_size=size,
+        fields=selected
     )
     if not persons:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail=messages.PERSONS_NOT_FOUND
         )
-    return [Person.parse_obj(person) for person in persons]
+    set_page_headers(response, persons)
+    return parse_obj_as(List[sparse_model(Person, selected)], persons.items)
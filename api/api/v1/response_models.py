@@ -1,5 +1,5 @@
 from lib2to3.pytree import Base
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 
 from pydantic import BaseModel
 
@@ -7,6 +7,8 @@ from core.models_config import BaseConfig
 
 
 class Genre(BaseModel):
+    cache_tag: ClassVar[str] = "genre"
+
     uuid: str
     name: str
 
@@ -15,6 +17,8 @@ class Genre(BaseModel):
 
 
 class PersonSummary(BaseModel):
+    cache_tag: ClassVar[str] = "person"
+
     uuid: str
     full_name: str
 
@@ -23,6 +27,8 @@ class PersonSummary(BaseModel):
 
 
 class FilmSummary(BaseModel):
+    cache_tag: ClassVar[str] = "film"
+
     uuid: str
     title: str
     imdb_rating: Optional[float]
@@ -39,5 +45,29 @@ class Film(FilmSummary):
     directors: List[PersonSummary]
 
 
+class PersonFilm(FilmSummary):
+    roles: List[str]
+
+
 class Person(PersonSummary):
-    film_ids: List[Film]
+    film_ids: List[PersonFilm]
+
+
+class FilmBatch(BaseModel):
+    items: List[Film]
+    not_found: List[str]
+    # только при недоступности ES: id без записи в кэше
+    unavailable: List[str] = []
+
+    class Config(BaseConfig):
+        pass
+
+
+class PersonBatch(BaseModel):
+    items: List[Person]
+    not_found: List[str]
+    # только при недоступности ES: id без записи в кэше
+    unavailable: List[str] = []
+
+    class Config(BaseConfig):
+        pass
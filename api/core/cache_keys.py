@@ -0,0 +1,98 @@
+import hashlib
+import inspect
+from typing import Any, Callable, Dict, Tuple
+
+import orjson
+from fastapi import BackgroundTasks, Request, Response, params
+from pydantic.fields import FieldInfo
+
+
+# Поднять версию, если меняется формат ключа или содержимого записей:
+# старые ключи просто перестанут читаться и истекут сами
+CACHE_KEY_NAMESPACE = "url_cache"
+CACHE_KEY_VERSION = "v2"
+CACHE_KEY_DIGEST_SIZE = 32
+
+# то, что FastAPI подставляет сам и что не влияет на содержимое ответа
+INJECTED_TYPES = (Request, Response, BackgroundTasks)
+
+
+def normalize_search_text(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    return value
+
+
+def normalize_fields(value: Any) -> Any:
+    # fields=imdb_rating,title и fields=title,imdb_rating - один ответ
+    if isinstance(value, str):
+        return ",".join(sorted({name.strip() for name in value.split(",") if name.strip()})) or None
+    return value
+
+
+NORMALIZERS: Dict[str, Callable[[Any], Any]] = {
+    "query": normalize_search_text,
+    "prefix": normalize_search_text,
+    "fields": normalize_fields,
+}
+
+
+class CacheKeyBuilder:
+    """Канонический ключ кэша по сигнатуре view.
+
+    Сигнатура разбирается один раз при декорировании: зависимости (Depends,
+    Request и т.п.) отбрасываются, для остальных параметров запоминаются
+    значения по умолчанию. Ключ - короткий дайджест от упорядоченных по
+    сигнатуре нормализованных значений, поэтому не зависит ни от порядка
+    параметров в запросе, ни от длины поисковой строки.
+    """
+
+    def __init__(
+        self,
+        func: Callable,
+        normalizers: Dict[str, Callable[[Any], Any]] = NORMALIZERS
+    ) -> None:
+        self.name = func.__name__
+        self.normalizers = normalizers
+        self.signature = inspect.signature(func)
+        self.params: Tuple[Tuple[str, Any], ...] = tuple(
+            (name, self._default(parameter))
+            for name, parameter in self.signature.parameters.items()
+            if not self._is_injected(parameter)
+        )
+
+    @staticmethod
+    def _is_injected(parameter: inspect.Parameter) -> bool:
+        if isinstance(parameter.default, params.Depends):
+            return True
+        annotation = parameter.annotation
+        return inspect.isclass(annotation) and issubclass(annotation, INJECTED_TYPES)
+
+    @staticmethod
+    def _default(parameter: inspect.Parameter) -> Any:
+        default = parameter.default
+        if isinstance(default, FieldInfo):  # Query(...), Path(...)
+            return default.default
+        if default is inspect.Parameter.empty:
+            return None
+        return default
+
+    def values(self, args: tuple, kwargs: dict) -> list:
+        arguments = self.signature.bind_partial(*args, **kwargs).arguments
+        values = []
+        for name, default in self.params:
+            value = arguments.get(name, default)
+            normalizer = self.normalizers.get(name)
+            if normalizer is not None:
+                value = normalizer(value)
+            values.append(value)
+        return values
+
+    def argument(self, args: tuple, kwargs: dict, name: str) -> Any:
+        return self.signature.bind_partial(*args, **kwargs).arguments.get(name)
+
+    def __call__(self, args: tuple, kwargs: dict) -> str:
+        digest = hashlib.sha256(
+            orjson.dumps(self.values(args, kwargs), default=str)
+        ).hexdigest()[:CACHE_KEY_DIGEST_SIZE]
+        return f"{CACHE_KEY_NAMESPACE}:{CACHE_KEY_VERSION}:{self.name}:{digest}"
@@ -0,0 +1,50 @@
+from typing import Any, Iterable, List, Set
+
+from pydantic import BaseModel
+
+
+# индекс ES -> сущность в тегах кэша (см. cache_tag в api/v1/response_models.py)
+INDEX_ENTITIES = {
+    "movies": "film",
+    "persons": "person",
+    "genres": "genre",
+}
+# тег страниц-списков: новая сущность может попасть в любую из них
+LIST_TAG = "list"
+
+
+def entity_tag(entity: str, uuid: str) -> str:
+    return f"{entity}:{uuid}"
+
+
+def _walk(data: Any, tags: Set[str]) -> None:
+    if isinstance(data, BaseModel):
+        entity = getattr(data, "cache_tag", None)
+        uuid = getattr(data, "uuid", None)
+        if entity and uuid:
+            tags.add(entity_tag(entity, uuid))
+        for value in data.__dict__.values():
+            _walk(value, tags)
+    elif isinstance(data, (list, tuple)):
+        for item in data:
+            _walk(item, tags)
+
+
+def collect_tags(data: Any) -> Set[str]:
+    """Теги всех сущностей, попавших в ответ view."""
+    tags: Set[str] = set()
+    _walk(data, tags)
+    if isinstance(data, (list, tuple)):
+        tags.update(
+            entity_tag(item.cache_tag, LIST_TAG)
+            for item in data
+            if getattr(item, "cache_tag", None)
+        )
+    return tags
+
+
+def tags_for_changes(index: str, ids: Iterable[str]) -> List[str]:
+    entity = INDEX_ENTITIES.get(index)
+    if entity is None:
+        return []
+    return [entity_tag(entity, uuid) for uuid in ids] + [entity_tag(entity, LIST_TAG)]
@@ -0,0 +1,53 @@
+import time
+
+
+class CircuitBreaker:
+    """Размыкатель цепи для внешнего сервиса (в пределах процесса).
+
+    closed - вызовы идут, подряд идущие отказы считаются; после
+    failure_threshold отказов цепь размыкается (open) и вызовы сразу
+    отклоняются. Через reset_timeout секунд пропускается один пробный
+    вызов (half-open): успех замыкает цепь, отказ размыкает снова.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        # пробный вызов отменён, не дав ответа: следующий может пробовать снова
+        self._trial_in_flight = False
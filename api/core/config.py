@@ -23,6 +23,78 @@ ELASTICSEARCH_ADDRESS = os.getenv(
     '["http://localhost:9200"]'
 )
 
+# L1-кэш url_cache в памяти процесса перед redis (0 - отключить L1)
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_L1_EXPIRE = float(os.getenv("CACHE_L1_EXPIRE", 5))
+# Межпроцессный лок на заполнение ключа: пока он взят, остальные воркеры
+# опрашивают кэш раз в CACHE_LOCK_POLL_INTERVAL секунд, а не идут в ES
+CACHE_LOCK_EXPIRE_MS = int(os.getenv("CACHE_LOCK_EXPIRE_MS", 3000))
+CACHE_LOCK_POLL_INTERVAL = float(os.getenv("CACHE_LOCK_POLL_INTERVAL", 0.05))
+# записи крупнее порога хранятся в gzip и отдаются клиенту как есть
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 1024))
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", 6))
+# сколько помнить 404 по id (снимается раньше, если ETL загрузит объект)
+CACHE_NOT_FOUND_EXPIRE = int(os.getenv("CACHE_NOT_FOUND_EXPIRE", 15))
+# сколько ещё хранить запись после expire на случай недоступности ES
+# (для ручек, включивших это в url_cache(fallback=...))
+CACHE_FALLBACK_EXPIRE = int(os.getenv("CACHE_FALLBACK_EXPIRE", 24 * 60 * 60))
+# канал, в который ETL публикует изменённые id (см. etl/etl/loader.py)
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+# пауза перед переподпиской на канал после обрыва соединения с redis
+CACHE_INVALIDATION_RECONNECT_DELAY = float(os.getenv("CACHE_INVALIDATION_RECONNECT_DELAY", 1))
+
+# потолок page[size] и глубина from+size, дальше которой только курсором
+ES_MAX_PAGE_SIZE = int(os.getenv("ES_MAX_PAGE_SIZE", 100))
+ES_MAX_RESULT_WINDOW = int(os.getenv("ES_MAX_RESULT_WINDOW", 10000))
+# Клиент ES: пул соединений на узел, таймаут запроса по умолчанию,
+# повторы по таймауту, сжатие HTTP и sniffing узлов кластера
+ES_POOL_MAXSIZE = int(os.getenv("ES_POOL_MAXSIZE", 25))
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", 5))
+ES_RETRY_ON_TIMEOUT = os.getenv("ES_RETRY_ON_TIMEOUT", "true").lower() == "true"
+ES_MAX_RETRIES = int(os.getenv("ES_MAX_RETRIES", 1))
+ES_HTTP_COMPRESS = os.getenv("ES_HTTP_COMPRESS", "false").lower() == "true"
+ES_SNIFF_ON_START = os.getenv("ES_SNIFF_ON_START", "false").lower() == "true"
+ES_SNIFF_ON_CONNECTION_FAIL = os.getenv("ES_SNIFF_ON_CONNECTION_FAIL", "false").lower() == "true"
+ES_SNIFFER_TIMEOUT = float(os.getenv("ES_SNIFFER_TIMEOUT", 0))  # 0 - не переопрашивать
+# Таймауты операций ES (сек) и circuit breaker: после ES_BREAKER_FAILURES
+# отказов подряд запросы к ES не делаются ES_BREAKER_RESET_TIMEOUT секунд
+ES_TIMEOUT_GET = float(os.getenv("ES_TIMEOUT_GET", 1.0))
+ES_TIMEOUT_MGET = float(os.getenv("ES_TIMEOUT_MGET", 2.0))
+ES_TIMEOUT_SEARCH = float(os.getenv("ES_TIMEOUT_SEARCH", 3.0))
+ES_BREAKER_FAILURES = int(os.getenv("ES_BREAKER_FAILURES", 5))
+ES_BREAKER_RESET_TIMEOUT = float(os.getenv("ES_BREAKER_RESET_TIMEOUT", 10))
+# одиночные get за ES_MGET_WINDOW сек (или до ES_MGET_MAX_BATCH id) идут одним mget
+ES_MGET_WINDOW = float(os.getenv("ES_MGET_WINDOW", 0.002))
+ES_MGET_MAX_BATCH = int(os.getenv("ES_MGET_MAX_BATCH", 100))
+# до скольки ES точно считает total; дальше - нижняя граница ("gte")
+ES_TRACK_TOTAL_HITS = int(os.getenv("ES_TRACK_TOTAL_HITS", 1000))
+# каталог жанров в памяти: полное обновление раз в интервал и по сигналу ETL
+GENRE_CATALOG_REFRESH_INTERVAL = float(os.getenv("GENRE_CATALOG_REFRESH_INTERVAL", 300))
+GENRE_CATALOG_MAX_SIZE = int(os.getenv("GENRE_CATALOG_MAX_SIZE", 1000))
+# max-age ответов ручек жанров (ETag - версия каталога)
+GENRE_CATALOG_MAX_AGE = int(os.getenv("GENRE_CATALOG_MAX_AGE", 120))
+# подсказки поиска (/films/suggest, /persons/suggest)
+SUGGEST_DEFAULT_SIZE = int(os.getenv("SUGGEST_DEFAULT_SIZE", 10))
+SUGGEST_MAX_SIZE = int(os.getenv("SUGGEST_MAX_SIZE", 20))
+# сколько id можно запросить разом в /films/batch и /persons/batch
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", 100))
+# bloom-фильтры id от ETL: полная перезагрузка из redis раз в интервал
+ID_FILTER_REFRESH_INTERVAL = float(os.getenv("ID_FILTER_REFRESH_INTERVAL", 300))
+
 AUTH_APP = os.getenv("AUTH_APP", "auth")
 
+# Ключи должны совпадать с JWT_SECRET_KEY сервиса auth (auth/src/config.py).
+# Если задан JWT_PUBLIC_KEY, подпись проверяется им (RS256/ES256 и т.п.)
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "super_secret")
+JWT_PUBLIC_KEY = os.getenv("JWT_PUBLIC_KEY", "")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+AUTH_REVOCATION_CACHE_TTL = int(os.getenv("AUTH_REVOCATION_CACHE_TTL", 60))
+
+# Долгоживущий keep-alive клиент к auth и in-process кэш вердиктов по токенам
+AUTH_POOL_MAXSIZE = int(os.getenv("AUTH_POOL_MAXSIZE", 20))
+AUTH_POOL_KEEPALIVE = int(os.getenv("AUTH_POOL_KEEPALIVE", 10))
+AUTH_TIMEOUT = float(os.getenv("AUTH_TIMEOUT", 2.0))
+AUTH_VERDICT_CACHE_TTL = int(os.getenv("AUTH_VERDICT_CACHE_TTL", 30))
+AUTH_VERDICT_CACHE_SIZE = int(os.getenv("AUTH_VERDICT_CACHE_SIZE", 10000))
+
 BASE_DIR = Path(__file__).parent.parent
@@ -0,0 +1,26 @@
+import base64
+import binascii
+
+import orjson
+
+from core import messages
+
+
+# Курсор непрозрачен для клиента: base64url от json с состоянием пагинации
+# ({"after": sort-значения последнего документа,
+# "query": FilmQueryBuilder.cursor_key - хэш сортировки и запроса})
+
+
+def encode_cursor(state: dict) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(state)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError) as exc:
+        raise ValueError(messages.INVALID_CURSOR) from exc
+    if not isinstance(state, dict) or not isinstance(state.get("after"), list):
+        raise ValueError(messages.INVALID_CURSOR)
+    return state
@@ -1,32 +1,18 @@
-def get_filter_genre_query(filter_genre):
-    return {
-        "query": {
-            "bool": {
-                "filter": [
-                    {
-                        "nested": {
-                            "path": "genres",
-                            "query": [
-                                {"match": {"genres.uuid": filter_genre}}
-                            ],
-                        }
-                    }
-                ]
-            }
-        }
-    }
-
-
 def get_query_for_match_all():
     return {"query": {"match_all": {}}}
 
 
-def get_search_film_query(search_text):
+def get_suggest_film_query(prefix, size, fields):
     return {
-        "query": {
-            "multi_match": {
-                "query": search_text,
-                "fields": ["title", "description"]
+        "_source": fields,
+        "suggest": {
+            "films": {
+                "prefix": prefix,
+                "completion": {
+                    "field": "title_suggest",
+                    "size": size,
+                    "skip_duplicates": True
+                }
             }
         }
     }
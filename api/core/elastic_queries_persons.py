@@ -1,50 +1,25 @@
-def get_persons_movies_query(person_ids: list):
+def get_persons_search_query(search_text):
     return {
         "query": {
-           "bool": {
-              "should": [
-                   {
-                       "nested": {
-                         "path": "actors",
-                         "query": {
-                             "terms": {
-                                 "actors.uuid": person_ids
-                             }
-                         }
-                       }
-                   },
-                   {
-                       "nested": {
-                         "path": "directors",
-                         "query": {
-                             "terms": {
-                                 "directors.uuid": person_ids
-                             }
-                         }
-                       }
-                   },
-                   {
-                      "nested": {
-                          "path": "writers",
-                          "query": {
-                              "terms": {
-                                  "writers.uuid": person_ids
-                              }
-                          }
-                      }
-                   }
-              ]
-           }
+            "match": {
+                "full_name": {
+                    "query": search_text
+                }
+            }
         }
     }
 
 
-def get_persons_search_query(search_text):
+def get_suggest_persons_query(prefix, size, fields):
     return {
-        "query": {
-            "match": {
-                "full_name": {
-                    "query": search_text
+        "_source": fields,
+        "suggest": {
+            "persons": {
+                "prefix": prefix,
+                "completion": {
+                    "field": "full_name_suggest",
+                    "size": size,
+                    "skip_duplicates": True
                 }
             }
         }
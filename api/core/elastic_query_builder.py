@@ -0,0 +1,166 @@
+import hashlib
+from typing import List, Optional
+
+import orjson
+
+from core import config, messages
+
+
+# публичное имя поля сортировки -> поле индекса movies (title - text,
+# сортировать можно только по keyword-подполю)
+FILM_SORT_FIELDS = {
+    "imdb_rating": "imdb_rating",
+    "title": "title.raw",
+}
+
+FILM_PERSON_ROLES = ("actors", "writers", "directors")
+
+
+def parse_sort(sort: Optional[str]) -> List[dict]:
+    """"-imdb_rating" / "_imdb_rating" - по убыванию, "imdb_rating" - по возрастанию.
+
+    Raises:
+        ValueError: поле не из FILM_SORT_FIELDS
+    """
+    if not sort:
+        return []
+    order = "asc"
+    if sort[0] in "-_":
+        sort, order = sort[1:], "desc"
+    field = FILM_SORT_FIELDS.get(sort)
+    if field is None:
+        raise ValueError(messages.INVALID_SORT)
+    return [{field: order}]
+
+
+class FilmQueryBuilder:
+    """Тело поиска по индексу movies.
+
+    Всё, что не влияет на релевантность (жанр и т.п.), идёт в filter context:
+    такие условия не считают score и кэшируются ES в filter cache. Запросы
+    без полнотекстовой части детерминированы (полная сортировка с uuid в
+    конце), поэтому для них включается shard request cache: повторные
+    страницы одного фильтра отдаются шардом из кэша. Скоринговые запросы
+    не кэшируются: score на разных репликах может немного отличаться.
+    """
+
+    def __init__(self, max_page_size: int = config.ES_MAX_PAGE_SIZE) -> None:
+        self.max_page_size = max_page_size
+        self.must: List[dict] = []
+        self.filter: List[dict] = []
+        self.sort: List[dict] = []
+        self.source: Optional[List[str]] = None
+        self.size = max_page_size
+        self.offset: Optional[int] = 0
+        self.search_after: Optional[list] = None
+
+    def text(self, search_text: str) -> "FilmQueryBuilder":
+        self.must.append({
+            "multi_match": {
+                "query": search_text,
+                "fields": ["title", "description"]
+            }
+        })
+        self.sort = [{"_score": "desc"}]
+        return self
+
+    def genre(self, genre_id: str) -> "FilmQueryBuilder":
+        self.filter.append({
+            "nested": {
+                "path": "genres",
+                "query": {"term": {"genres.uuid": genre_id}}
+            }
+        })
+        return self
+
+    def person(self, person_id: str) -> "FilmQueryBuilder":
+        # фильмы персоны в любой роли
+        self.filter.append({
+            "bool": {
+                "should": [
+                    {
+                        "nested": {
+                            "path": role,
+                            "query": {"term": {f"{role}.uuid": person_id}}
+                        }
+                    }
+                    for role in FILM_PERSON_ROLES
+                ],
+                "minimum_should_match": 1
+            }
+        })
+        return self
+
+    def sort_by(self, sort: Optional[str]) -> "FilmQueryBuilder":
+        self.sort = parse_sort(sort)
+        return self
+
+    def fields(self, fields: Optional[List[str]]) -> "FilmQueryBuilder":
+        self.source = fields or None
+        return self
+
+    def page(self, page_number: int, page_size: int) -> "FilmQueryBuilder":
+        self.size = max(1, min(page_size, self.max_page_size))
+        self.offset = max(page_number - 1, 0) * self.size
+        self.search_after = None
+        return self
+
+    def after(self, search_after: list, page_size: int) -> "FilmQueryBuilder":
+        """Продолжение после документа с sort-значениями search_after.
+
+        Raises:
+            ValueError: значений не столько, сколько полей сортировки
+        """
+        if len(search_after) != len(self.sort) + 1:
+            raise ValueError(messages.INVALID_CURSOR)
+        self.size = max(1, min(page_size, self.max_page_size))
+        self.offset = None
+        self.search_after = search_after
+        return self
+
+    @property
+    def out_of_window(self) -> bool:
+        # глубже max_result_window ES ответит ошибкой: туда только курсором
+        return (
+            self.offset is not None and
+            self.offset + self.size > config.ES_MAX_RESULT_WINDOW
+        )
+
+    @property
+    def cursor_key(self) -> str:
+        # курсор годен только для той же сортировки и того же запроса
+        return hashlib.blake2b(
+            orjson.dumps([self.sort, self.query()], option=orjson.OPT_SORT_KEYS),
+            digest_size=8
+        ).hexdigest()
+
+    @property
+    def request_cache(self) -> bool:
+        return not self.must
+
+    def query(self) -> dict:
+        if not self.must and not self.filter:
+            return {"match_all": {}}
+        clauses = {}
+        if self.must:
+            clauses["must"] = self.must
+        if self.filter:
+            clauses["filter"] = self.filter
+        return {"bool": clauses}
+
+    def build(self) -> dict:
+        # uuid замыкает сортировку: порядок полный, search_after однозначен
+        # лишний документ сверх страницы - признак того, что есть следующая
+        body = {
+            "query": self.query(),
+            "sort": self.sort + [{"uuid": "asc"}],
+            "size": self.size + 1,
+            "track_total_hits": config.ES_TRACK_TOTAL_HITS,
+        }
+        if self.source:
+            body["_source"] = self.source
+        if self.search_after is not None:
+            body["search_after"] = self.search_after
+        else:
+            body["from"] = self.offset
+        return body
@@ -4,3 +4,9 @@ PERSON_NOT_FOUND = "person not found"
 PERSONS_NOT_FOUND = "persons not found"
 GENRE_NOT_FOUND = "genre not found"
 GENRES_NOT_FOUND = "genres not found"
+INVALID_CURSOR = "invalid cursor"
+INVALID_SORT = "invalid sort"
+TOO_MANY_IDS = "too many ids"
+NO_IDS = "ids are required"
+SERVICE_UNAVAILABLE = "search is temporarily unavailable"
+INVALID_FIELDS = "invalid fields"
@@ -1,56 +1,504 @@
-from functools import wraps
-import re
+import asyncio
+from dataclasses import dataclass, field
+from functools import partial, wraps
+import hashlib
+from http import HTTPStatus
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-from services.cache import RedisCacheStorage, BaseCacheStorage
+from services.cache import (
+    BaseCacheStorage,
+    CacheEntry,
+    RedisCacheStorage,
+    TwoTierCacheStorage,
+)
+from fastapi import HTTPException, Request, Response
 import orjson
-from pydantic import BaseModel, parse_raw_as
+from pydantic import BaseModel
 
+from core import config, messages
+from core.cache_keys import CacheKeyBuilder
+from core.cache_tags import collect_tags, entity_tag
+from db.elastic import is_unavailable
 from db.redis import get_redis
 
 
+default_storage = TwoTierCacheStorage(
+    RedisCacheStorage(get_redis),
+    max_bytes=config.CACHE_L1_MAX_BYTES,
+    l1_expire=config.CACHE_L1_EXPIRE
+)
+
+logger = logging.getLogger(__name__)
+
+# ключ -> future вычисления, которое уже идёт в этом процессе
+_inflight: Dict[str, asyncio.Future] = {}
+# сильные ссылки на фоновые обновления, иначе event loop может их потерять
+_background_tasks: Set[asyncio.Task] = set()
+# ключи, которые сейчас обновляются в фоне. Отдельно от _inflight: фоновое
+# обновление не ждёт чужой лок и может закончиться ничем, а запрос, которому
+# нужен ответ, не должен получить этот пустой результат
+_refreshing: Set[str] = set()
+
+
+async def single_flight(cache_key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """Одно вычисление на ключ в пределах процесса, остальные ждут его результат.
+
+    Если ведущего отменили (его клиент отключился), ждущие не наследуют
+    отмену: один из них становится ведущим и считает заново.
+    """
+    future = _inflight.get(cache_key)
+    while future is not None:
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise  # отменили самого ждущего
+        future = _inflight.get(cache_key)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[cache_key] = future
+    try:
+        result = await compute()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # ждущих может не быть - не логируем "never retrieved"
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _inflight.pop(cache_key, None)
+
+
+async def wait_for_fill(
+    storage: BaseCacheStorage,
+    cache_key: str,
+    timeout: float
+) -> Optional[CacheEntry]:
+    """Опрос кэша, пока ключ заполняет другой воркер (держатель лока).
+
+    Просроченная запись (та, из-за которой и пошли считать, пока её
+    хранят про запас) ответом держателя лока не считается.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(config.CACHE_LOCK_POLL_INTERVAL)
+        cache_data = await storage.get_data_from_cache(cache_key)
+        if cache_data and not cache_data.is_expired():
+            return cache_data
+    return None
+
+
+def _on_refresh_done(cache_key: str, task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    _refreshing.discard(cache_key)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("cache refresh failed: %r", task.exception())
+
+
+def refresh_in_background(cache_key: str, compute: Callable[[], Awaitable[Any]]) -> None:
+    """Фоновое обновление устаревшей записи; не более одного на ключ в процессе."""
+    if cache_key in _inflight or cache_key in _refreshing:
+        return
+    _refreshing.add(cache_key)
+    task = asyncio.create_task(compute())
+    _background_tasks.add(task)
+    task.add_done_callback(partial(_on_refresh_done, cache_key))
+
+
+# параметр, которым url_cache получает Request, не трогая сигнатуру view
+REQUEST_PARAM = "url_cache_request"
+# ответ из просроченной записи, пока ES недоступен: сколько секунд он устарел
+STALE_HEADER = "X-Cache-Stale"
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def accepts_encoding(encoding: str, accept_encoding: Optional[str]) -> bool:
+    if not accept_encoding:
+        return False
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        quality = params.strip().removeprefix("q=")
+        try:
+            return not quality or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def cached_response(
+    cache_data: CacheEntry,
+    request: Optional[Request],
+    stale: bool = False
+) -> Response:
+    headers = {
+        **cache_data.headers,
+        "ETag": cache_data.etag,
+        "Cache-Control": f"max-age={cache_data.max_age()}",
+        "Vary": "Accept-Encoding",
+    }
+    if stale:
+        headers[STALE_HEADER] = str(cache_data.stale_for())
+        headers["Warning"] = '111 - "Revalidation Failed"'
+    if cache_data.status != HTTPStatus.OK:
+        return Response(
+            content=cache_data.decoded_payload(),
+            status_code=cache_data.status,
+            media_type="application/json",
+            headers={"Cache-Control": headers["Cache-Control"]}
+        )
+    if request is not None and etag_matches(
+        cache_data.etag, request.headers.get("if-none-match")
+    ):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    # тело уже сериализовано ровно так, как его отдал бы ORJSONResponse
+    # по response_model, поэтому отдаём байты без повторной валидации
+    payload = cache_data.payload
+    if cache_data.encoding:
+        if request is not None and accepts_encoding(
+            cache_data.encoding, request.headers.get("accept-encoding")
+        ):
+            headers["Content-Encoding"] = cache_data.encoding
+            # сжатое представление семантически равно исходному
+            headers["ETag"] = "W/" + cache_data.etag
+        else:
+            payload = cache_data.decoded_payload()
+    return Response(
+        content=payload,
+        media_type="application/json",
+        headers=headers
+    )
+
+
+def find_response_param(func: Callable) -> Optional[str]:
+    for name, parameter in inspect.signature(func).parameters.items():
+        if parameter.annotation is Response:
+            return name
+    return None
+
+
+def view_headers(response: Response) -> Dict[str, str]:
+    # служебные заголовки пересчитываются при отдаче, храним только свои
+    return {
+        name: value for name, value in response.headers.items()
+        if name not in ("content-length", "content-type")
+    }
+
+
+def with_request_param(func: Callable, inner: Callable) -> None:
+    """Добавляет в сигнатуру обёртки Request, чтобы его подставил FastAPI."""
+    signature = inspect.signature(func)
+    inner.__signature__ = signature.replace(parameters=[
+        *signature.parameters.values(),
+        inspect.Parameter(
+            REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request
+        ),
+    ])
+
+
+async def store_entry(
+    storage: BaseCacheStorage,
+    cache_key: str,
+    data: Any,
+    expire: int,
+    stale: int,
+    headers: Optional[Dict[str, str]] = None,
+    fallback: int = 0
+) -> CacheEntry:
+    if not isinstance(data, BaseModel):
+        data_in_redis_format = orjson.dumps([part.dict() for part in data])
+    else:
+        data_in_redis_format = orjson.dumps(data.dict())
+
+    now = time.time()
+    cache_data = CacheEntry(
+        payload=data_in_redis_format,
+        soft_expire_at=now + expire,
+        expire_at=now + expire + stale,
+        headers=headers or {},
+    )
+    cache_data.compress(
+        config.CACHE_COMPRESS_MIN_BYTES, config.CACHE_COMPRESS_LEVEL
+    )
+    # fallback секунд после expire_at запись - запасной ответ на время отказа ES
+    await storage.set_data_to_cache(
+        cache_key,
+        cache_data,
+        expire=expire + stale + fallback,
+        tags=collect_tags(data)
+    )
+    return cache_data
+
+
+async def store_tombstone(
+    storage: BaseCacheStorage,
+    cache_key: str,
+    exc: HTTPException,
+    expire: int,
+    tags: Iterable[str] = ()
+) -> CacheEntry:
+    """Запоминает 404 view: до expire или до загрузки объекта ETL (по тегу)."""
+    now = time.time()
+    cache_data = CacheEntry(
+        payload=orjson.dumps({"detail": exc.detail}),
+        soft_expire_at=now + expire,
+        expire_at=now + expire,
+        status=int(exc.status_code),
+    )
+    await storage.set_data_to_cache(cache_key, cache_data, expire=expire, tags=tags)
+    return cache_data
+
+
+def parse_batch_ids(ids: List[str]) -> List[str]:
+    """ids=a,b&ids=c -> [a, b, c] без повторов, в порядке запроса."""
+    parsed = list(dict.fromkeys(
+        uuid.strip() for value in ids for uuid in value.split(",") if uuid.strip()
+    ))
+    if not parsed:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail=messages.NO_IDS
+        )
+    if len(parsed) > config.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail=messages.TOO_MANY_IDS
+        )
+    return parsed
+
+
+@dataclass
+class BatchPayloads:
+    """Результат cached_batch.
+
+    payloads - тела ответов по id; unavailable - id, которых нет в кэше,
+    пока ES недоступен (существуют ли они - неизвестно, это не not_found);
+    stale_for - если отданы устаревшие записи, на сколько секунд (наибольшее).
+    max_age - наименьший срок свежести среди использованных записей.
+    """
+
+    payloads: Dict[str, bytes]
+    unavailable: List[str] = field(default_factory=list)
+    stale_for: Optional[int] = None
+    max_age: int = 0
+
+
+async def cached_batch(
+    view: Callable,
+    param: str,
+    ids: List[str],
+    fetch: Callable[[List[str]], Awaitable[Dict[str, BaseModel]]],
+    params: Optional[Dict[str, Any]] = None
+) -> BatchPayloads:
+    """Тела ответов view (под url_cache) для каждого id.
+
+    Кэш view читается одним запросом на все ключи, промахи и устаревшие
+    записи добираются одним fetch и кладутся под ключами view, так что
+    пакетные и одиночные запросы прогревают кэш друг для друга.
+    params - остальные параметры view, влияющие на ключ (например, fields).
+    Raises:
+        ElasticsearchException: ES недоступен и в кэше нет ни одного id
+    """
+    storage = view.cache_storage
+    await storage.async_init()
+    cache_keys = {
+        uuid: view.cache_key(**{**(params or {}), param: uuid}) for uuid in ids
+    }
+    entries = await storage.get_many_from_cache(list(cache_keys.values()))
+
+    payloads = {}
+    not_found = set()  # свежие "надгробия": в ES не ходим
+    max_ages = []  # ответ свеж, пока свежа каждая запись, из которой он собран
+    for uuid, cache_data in zip(cache_keys, entries):
+        if cache_data and cache_data.is_fresh():
+            max_ages.append(cache_data.max_age())
+            if cache_data.status == HTTPStatus.OK:
+                payloads[uuid] = cache_data.decoded_payload()
+            else:
+                not_found.add(uuid)
+
+    missed = [uuid for uuid in ids if uuid not in payloads and uuid not in not_found]
+    if missed:
+        try:
+            found = await fetch(missed)
+        except Exception as exc:
+            if not is_unavailable(exc):
+                raise
+            # ES недоступен: отдаём что есть, пусть и устаревшее (max-age=0)
+            batch = BatchPayloads(payloads)
+            for uuid, cache_data in zip(cache_keys, entries):
+                if cache_data and cache_data.status == HTTPStatus.OK and uuid not in payloads:
+                    payloads[uuid] = cache_data.decoded_payload()
+                    batch.stale_for = max(batch.stale_for or 0, cache_data.stale_for())
+            if not payloads:
+                raise
+            logger.warning("serving batch from cache: %r", exc)
+            batch.unavailable = [uuid for uuid in missed if uuid not in payloads]
+            return batch
+        stored = await asyncio.gather(*(
+            store_entry(
+                storage, cache_keys[uuid], data, view.cache_expire, view.cache_stale,
+                fallback=view.cache_fallback
+            )
+            for uuid, data in found.items()
+        ))
+        for uuid, cache_data in zip(found, stored):
+            payloads[uuid] = cache_data.decoded_payload()
+            max_ages.append(cache_data.max_age())
+        if len(found) < len(missed):  # отсутствие помним не дольше, чем 404 view
+            max_ages.append(view.cache_not_found_expire)
+    return BatchPayloads(payloads, max_age=min(max_ages, default=0))
+
+
+def batch_response(
+    ids: List[str],
+    batch: BatchPayloads,
+    request: Optional[Request] = None
+) -> Response:
+    # {"items": [...], "not_found": [...]} собирается из готовых тел записей;
+    # "unavailable" - только когда ES недоступен
+    payloads = batch.payloads
+    unavailable = set(batch.unavailable)
+    parts = [
+        b'{"items":[',
+        b",".join(payloads[uuid] for uuid in ids if uuid in payloads),
+        b'],"not_found":',
+        orjson.dumps([
+            uuid for uuid in ids if uuid not in payloads and uuid not in unavailable
+        ]),
+    ]
+    if unavailable:
+        parts += [b',"unavailable":', orjson.dumps([uuid for uuid in ids if uuid in unavailable])]
+    parts.append(b"}")
+    content = b"".join(parts)
+    etag = '"{0}"'.format(hashlib.blake2b(content, digest_size=16).hexdigest())
+    headers = {"ETag": etag, "Cache-Control": f"max-age={batch.max_age}"}
+    if batch.stale_for is not None:
+        headers[STALE_HEADER] = str(batch.stale_for)
+        headers["Warning"] = '111 - "Revalidation Failed"'
+    if request is not None and etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
 # review: чуть более SOLID-но: сделать абстрактный cache,
 # инжектируея/параметризуя его абстрактным engine,
 # методами которого оперировать внутри реализации
 def url_cache(
     expire: int = 30,
-    storage: BaseCacheStorage = RedisCacheStorage(get_redis)
+    stale: int = 0,
+    not_found_expire: int = 0,
+    not_found_tag: Optional[Tuple[str, str]] = None,
+    fallback: int = 0,
+    storage: BaseCacheStorage = default_storage
 ):
+    """Кэширование ответа view.
+
+    expire - сколько секунд запись свежая; stale - сколько ещё секунд после
+    этого отдаётся устаревшая запись, пока она обновляется в фоне.
+    fallback - сколько секунд ещё хранить запись после этого: если пересчитать
+    ответ не удалось из-за недоступности ES, она отдаётся с заголовком
+    X-Cache-Stale. Только для ручек с ограниченным числом ключей (сведения
+    по id), не для поиска и подсказок.
+    Если у view есть параметр типа Response, выставленные в нём заголовки
+    сохраняются вместе с записью и отдаются на каждом попадании.
+    not_found_expire - на сколько секунд запоминать 404 view; not_found_tag -
+    (сущность, параметр с её id): по этому тегу ETL снимет "надгробие",
+    когда загрузит объект.
+    """
     def wrapper(func):
+        build_cache_key = CacheKeyBuilder(func)
+        response_param = find_response_param(func)
+
         @wraps(func)
         async def inner(*args, **kwargs):
+            request = kwargs.pop(REQUEST_PARAM, None)
             await storage.async_init()
-            kwargs_copy = kwargs.copy()
-            string_kwargs = str(kwargs_copy)
-            service_key_name = re.search(r"\w*_service", string_kwargs)
-
-            if service_key_name.group(0):
-                kwargs_copy.pop(service_key_name.group(0))
-
-            cache_key = func.__name__ + "="
-            for k, v in kwargs_copy.items():
-                cache_key += "::" + str(k) + "::" + str(v)
+            cache_key = build_cache_key(args, kwargs)
 
             return_type = func.__annotations__["return"]
             if not return_type:
                 return await func(*args, **kwargs)
 
-            cache_data = await storage.get_data_from_cache(cache_key)
-            if cache_data:
-                return parse_raw_as(return_type, cache_data)
+            async def fill(wait: bool = True):
+                lock_token = await storage.acquire_lock(
+                    cache_key, config.CACHE_LOCK_EXPIRE_MS
+                )
+                if lock_token is None:
+                    if not wait:
+                        return None  # обновлением уже занят другой воркер
+                    cache_data = await wait_for_fill(
+                        storage, cache_key, config.CACHE_LOCK_EXPIRE_MS / 1000
+                    )
+                    if cache_data:
+                        return cache_data
+                # лок наш, либо держатель не успел: считаем сами
+                try:
+                    response = Response()
+                    if response_param is not None:
+                        kwargs[response_param] = response
+                    try:
+                        data = await func(*args, **kwargs)
+                    except HTTPException as exc:
+                        if exc.status_code != HTTPStatus.NOT_FOUND or not not_found_expire:
+                            raise
+                        tags = []
+                        if not_found_tag is not None:
+                            entity, param = not_found_tag
+                            tags.append(entity_tag(
+                                entity, build_cache_key.argument(args, kwargs, param)
+                            ))
+                        return await store_tombstone(
+                            storage, cache_key, exc, not_found_expire, tags
+                        )
+                    cache_data = await store_entry(
+                        storage, cache_key, data, expire, stale,
+                        headers=view_headers(response), fallback=fallback
+                    )
+                finally:
+                    if lock_token is not None:
+                        await storage.release_lock(cache_key, lock_token)
 
-            data = await func(*args, **kwargs)
+                return cache_data
 
-            if not isinstance(data, BaseModel):
-                data_in_redis_format = orjson.dumps([part.dict() for part in data])
-            else:
-                data_in_redis_format = orjson.dumps(data.dict())
-
-            await storage.set_data_to_cache(
-                cache_key, data_in_redis_format, expire=expire
-            )
+            cache_data = await storage.get_data_from_cache(cache_key)
+            if cache_data and not cache_data.is_expired():
+                if not cache_data.is_fresh():
+                    refresh_in_background(cache_key, lambda: fill(wait=False))
+                return cached_response(cache_data, request)
 
-            return data
+            try:
+                return cached_response(await single_flight(cache_key, fill), request)
+            except Exception as exc:
+                if cache_data is None or not is_unavailable(exc):
+                    raise
+                logger.warning("serving expired %s: %r", cache_key, exc)
+                return cached_response(cache_data, request, stale=True)
 
+        with_request_param(func, inner)
+        # для пакетных запросов (cached_batch) к тем же записям
+        inner.cache_key = lambda **values: build_cache_key((), values)
+        inner.cache_expire = expire
+        inner.cache_stale = stale
+        inner.cache_fallback = fallback
+        inner.cache_not_found_expire = not_found_expire
+        inner.cache_storage = storage
         return inner
 
     return wrapper
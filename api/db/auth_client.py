@@ -0,0 +1,9 @@
+from typing import Optional
+from httpx import AsyncClient
+
+
+client: Optional[AsyncClient] = None
+
+
+def get_auth_client() -> AsyncClient:
+    return client
@@ -1,5 +1,146 @@
-from typing import Optional
-from elasticsearch import AsyncElasticsearch
+import json
+from typing import Any, Dict, List, Optional
+
+from elasticsearch import (
+    AsyncElasticsearch,
+    ConnectionError,
+    ElasticsearchException,
+    TransportError,
+)
+
+from core import config
+from core.circuit_breaker import CircuitBreaker
+
+
+class CircuitOpenError(ElasticsearchException):
+    """ES считается недоступным: вызов отклонён без обращения к кластеру."""
+
+
+def is_unavailable(exc: BaseException) -> bool:
+    """Отказ кластера, а не ответ на запрос (404, 400 и т.п.)."""
+    if isinstance(exc, (CircuitOpenError, ConnectionError)):  # и ConnectionTimeout
+        return True
+    if isinstance(exc, TransportError):
+        status = exc.status_code
+        return not isinstance(status, int) or status == 429 or status >= 500
+    return False
+
+
+class GuardedElasticsearch:
+    """AsyncElasticsearch с таймаутом на операцию и circuit breaker.
+
+    Пока цепь разомкнута, get/mget/search сразу бросают CircuitOpenError,
+    а не ждут таймаута: воркеры не копят очередь запросов к лежащему ES.
+    Остальные атрибуты (transport, close и т.д.) берутся у клиента как есть.
+    """
+
+    def __init__(
+        self,
+        client: AsyncElasticsearch,
+        breaker: CircuitBreaker,
+        timeouts: Dict[str, float]
+    ) -> None:
+        self.client = client
+        self.breaker = breaker
+        self.timeouts = timeouts
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    async def get(self, *args, **kwargs) -> dict:
+        return await self._call("get", *args, **kwargs)
+
+    async def mget(self, *args, **kwargs) -> dict:
+        return await self._call("mget", *args, **kwargs)
+
+    async def search(self, *args, **kwargs) -> dict:
+        return await self._call("search", *args, **kwargs)
+
+    async def _call(self, operation: str, *args, **kwargs) -> dict:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"elasticsearch circuit is {self.breaker.state}")
+        kwargs.setdefault("request_timeout", self.timeouts[operation])
+        try:
+            result = await getattr(self.client, operation)(*args, **kwargs)
+        except ElasticsearchException as exc:
+            if is_unavailable(exc):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()  # кластер ответил
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        self.breaker.record_success()
+        return result
+
+
+def parse_hosts(value: str) -> List[str]:
+    """'["http://es1:9200", ...]' (как в .env) или 'http://es1:9200,http://es2:9200'."""
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [host.strip() for host in value.split(",") if host.strip()]
+
+
+def create_elastic() -> GuardedElasticsearch:
+    """Клиент ES по настройкам из core.config.
+
+    Пул - на каждый узел кластера и на каждый воркер: при 16 воркерах и
+    3 узлах открыто до 16 * 3 * ES_POOL_MAXSIZE соединений. Повторы по
+    таймауту ограничены ES_MAX_RETRIES, так что операция длится не дольше
+    (ES_MAX_RETRIES + 1) * её таймаут.
+    """
+    client = AsyncElasticsearch(
+        hosts=parse_hosts(config.ELASTICSEARCH_ADDRESS),
+        maxsize=config.ES_POOL_MAXSIZE,
+        timeout=config.ES_REQUEST_TIMEOUT,
+        retry_on_timeout=config.ES_RETRY_ON_TIMEOUT,
+        max_retries=config.ES_MAX_RETRIES,
+        http_compress=config.ES_HTTP_COMPRESS,
+        sniff_on_start=config.ES_SNIFF_ON_START,
+        sniff_on_connection_fail=config.ES_SNIFF_ON_CONNECTION_FAIL,
+        sniffer_timeout=config.ES_SNIFFER_TIMEOUT or None,
+    )
+    return GuardedElasticsearch(
+        client,
+        breaker=CircuitBreaker(
+            failure_threshold=config.ES_BREAKER_FAILURES,
+            reset_timeout=config.ES_BREAKER_RESET_TIMEOUT
+        ),
+        timeouts={
+            "get": config.ES_TIMEOUT_GET,
+            "mget": config.ES_TIMEOUT_MGET,
+            "search": config.ES_TIMEOUT_SEARCH,
+        }
+    )
+
+
+def pool_stats(client: AsyncElasticsearch) -> List[dict]:
+    """Занятость пулов соединений по узлам (для метрик)."""
+    pool = client.transport.connection_pool
+    # помеченные мёртвыми узлы пул убирает из connections до воскрешения
+    live = {id(connection) for connection in pool.connections}
+    stats = []
+    for connection in getattr(pool, "orig_connections", pool.connections):
+        # aiohttp-сессия создаётся при первом запросе к узлу
+        session = getattr(connection, "session", None)
+        connector = session.connector if session is not None else None
+        in_use = len(connector._acquired) if connector is not None else 0
+        idle = (
+            sum(len(conns) for conns in connector._conns.values())
+            if connector is not None else 0
+        )
+        limit = connector.limit if connector is not None else None
+        stats.append({
+            "host": connection.host,
+            "limit": limit,
+            "in_use": in_use,
+            "idle": idle,
+            "utilization": round(in_use / limit, 3) if limit else 0,
+            "dead": id(connection) not in live,
+        })
+    return stats
 
 
 es: Optional[AsyncElasticsearch] = None
@@ -4,15 +4,21 @@ import logging
 import aioredis
 import httpx
 import uvicorn
-from elasticsearch import AsyncElasticsearch
+from elasticsearch import ElasticsearchException
 from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
 
 from api.v1 import films, genres, persons
-from core import config
+from core import config, messages
 from core.logger import LOGGING
+from core.view_decorators import default_storage
+from db import auth_client
 from db import elastic
 from db import redis
+from services import auth
+from services.cache_invalidation import CacheInvalidationListener
+from services.genres import genre_catalog
+from services.id_filter import id_filters
 
 
 app = FastAPI(
@@ -24,6 +30,15 @@ app = FastAPI(
     version="1.0.0"
 )
 
+cache_invalidation = CacheInvalidationListener(
+    default_storage, config.CACHE_INVALIDATION_CHANNEL
+)
+cache_invalidation.on_change("genres", genre_catalog.on_change)
+for id_filter in id_filters:
+    cache_invalidation.on_change(id_filter.index, id_filter.on_change)
+cache_invalidation.on_reconnect(genre_catalog.refresh)
+cache_invalidation.on_reconnect(id_filters.refresh)
+
 
 @app.on_event('startup')
 async def statup():
@@ -34,39 +49,71 @@ async def statup():
         minsize=10,
         maxsize=20
     )
-    elastic.es = AsyncElasticsearch(
-        hosts=eval(config.ELASTICSEARCH_ADDRESS)
+    elastic.es = elastic.create_elastic()
+    auth_client.client = httpx.AsyncClient(
+        base_url=f"http://{config.AUTH_APP}",
+        limits=httpx.Limits(
+            max_connections=config.AUTH_POOL_MAXSIZE,
+            max_keepalive_connections=config.AUTH_POOL_KEEPALIVE
+        ),
+        timeout=config.AUTH_TIMEOUT
     )
+    await genre_catalog.start(elastic.es)
+    await id_filters.start()
+    await cache_invalidation.start()
 
 
 @app.on_event('shutdown')
 async def shutdown():
+    await cache_invalidation.stop()
+    await genre_catalog.stop()
+    await id_filters.stop()
     await redis.redis.close()
     await redis.redis.wait_closed()
     await elastic.es.close()
+    await auth_client.client.aclose()
+
+
+@app.exception_handler(ElasticsearchException)
+async def elastic_unavailable(request: Request, exc: ElasticsearchException):
+    # сюда доходят только запросы без запасной записи в кэше
+    if not elastic.is_unavailable(exc):
+        raise exc
+    return ORJSONResponse(
+        content={"detail": messages.SERVICE_UNAVAILABLE},
+        status_code=http.HTTPStatus.SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(round(config.ES_BREAKER_RESET_TIMEOUT))}
+    )
 
 
 @app.middleware("http")
 async def verify_token(request: Request, call_next):
-    if request.headers['Authorization']:
-        async with httpx.AsyncClient() as client:
-            is_authorized = await client.post(
-                f"http://{config.AUTH_APP}/login",
-                headers={"Authorization": request.headers['Authorization']}
-            )
-
-        if is_authorized.status_code == http.HTTPStatus.ACCEPTED:
-            response = await call_next(request)
-        else:
-            return ORJSONResponse(content={
-                "message": "You need login for view films"
-            }, status_code=401)
-        
-        return response
-    else:
+    authorization = request.headers.get('Authorization')
+    if not authorization:
         return ORJSONResponse(content={
             "message": "we do not allow mobiles"
-        }, status_code=401)
+        }, status_code=http.HTTPStatus.UNAUTHORIZED)
+
+    if not await auth.verify_access_token(
+        authorization, request.headers.get("X-Request-Id")
+    ):
+        return ORJSONResponse(content={
+            "message": "You need login for view films"
+        }, status_code=http.HTTPStatus.UNAUTHORIZED)
+
+    return await call_next(request)
+
+
+@app.get('/api/metrics', include_in_schema=False)
+async def metrics():
+    return {
+        "elasticsearch": {
+            "pools": elastic.pool_stats(elastic.es),
+            "breaker": elastic.es.breaker.state,
+        },
+        "cache": default_storage.stats(),
+        "id_filters": id_filters.stats(),
+    }
 
 
 app.include_router(films.router, prefix='/api/v1/films')
@@ -23,5 +23,9 @@ class Film(FilmResponse):
     actors: List[Person]
 
 
+class PersonFilm(FilmResponse):
+    roles: List[str] = []
+
+
 class PersonResponse(Person):
-    film_ids: List[Film]
+    film_ids: List[PersonFilm] = []
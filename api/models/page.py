@@ -0,0 +1,34 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from .film import FilmResponse, PersonResponse
+from core.models_config import BaseConfig
+
+
+class Page(BaseModel):
+    next_cursor: Optional[str] = None
+    # total считается ES не дальше ES_TRACK_TOTAL_HITS: тогда relation "gte"
+    # и total - только нижняя граница
+    total: Optional[int] = None
+    total_relation: str = "eq"
+    has_more: bool = False
+
+    class Config(BaseConfig):
+        pass
+
+    @staticmethod
+    def total_from_hits(hits: dict) -> dict:
+        total = hits.get("total") or {}
+        return {
+            "total": total.get("value"),
+            "total_relation": total.get("relation", "eq"),
+        }
+
+
+class FilmPage(Page):
+    items: List[FilmResponse]
+
+
+class PersonPage(Page):
+    items: List[PersonResponse]
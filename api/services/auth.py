@@ -0,0 +1,158 @@
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+import jwt
+
+from core import config
+from db.auth_client import get_auth_client
+from db.redis import get_redis
+
+
+REVOKED_KEY_PREFIX = "auth:revoked:"
+REVOKED = b"1"
+NOT_REVOKED = b"0"
+# Статус токена в auth (auth/openapi/auth.yaml, blocklist RevokedTokenModel):
+# 200 {"revoked": true|false}. Любой другой ответ (5xx, 502 от nginx) - не вердикт
+TOKEN_STATUS_URL = "/api/v1/token_status/{jti}"
+
+
+def get_verification_key() -> str:
+    return config.JWT_PUBLIC_KEY or config.JWT_SECRET_KEY
+
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Проверяет подпись, срок действия и claims токена без обращения к auth."""
+    try:
+        claims = jwt.decode(
+            token,
+            get_verification_key(),
+            algorithms=[config.JWT_ALGORITHM],
+            options={"require": ["exp", "jti", "sub"]},
+        )
+    except jwt.PyJWTError:
+        return None
+    # refresh-токен не даёт доступа к API (flask-jwt-extended: claim "type")
+    if claims.get("type", "access") != "access":
+        return None
+    return claims
+
+
+async def is_token_revoked(
+    claims: dict,
+    request_id: Optional[str] = None
+) -> Optional[bool]:
+    """Проверка отзыва токена в auth с кэшированием вердикта в redis по jti.
+
+    Список отозванных токенов есть только у auth, поэтому это единственный
+    внешний вызов; вердикт живёт не дольше самого токена. Без X-Request-Id
+    auth отвечает ошибкой на любой запрос: передаём id входящего запроса
+    или свой.
+    """
+    redis = get_redis()
+    cache_key = REVOKED_KEY_PREFIX + claims["jti"]
+    cached = await redis.get(cache_key)
+    if cached is not None:
+        return cached == REVOKED
+
+    try:
+        response = await get_auth_client().get(
+            TOKEN_STATUS_URL.format(jti=quote(claims["jti"], safe="")),
+            headers={"X-Request-Id": request_id or uuid.uuid4().hex}
+        )
+        revoked = None
+        if response.status_code == HTTPStatus.OK:
+            revoked = response.json()["revoked"]
+    except (httpx.HTTPError, ValueError, KeyError, TypeError):
+        revoked = None  # auth недоступен или ответил не по контракту
+    if not isinstance(revoked, bool):
+        return None  # вердикта нет: не кэшируем, иначе заблокируем валидных
+    expire = min(
+        config.AUTH_REVOCATION_CACHE_TTL,
+        int(claims["exp"] - time.time())
+    )
+    if expire > 0:
+        await redis.set(
+            cache_key, REVOKED if revoked else NOT_REVOKED, expire=expire
+        )
+    return revoked
+
+
+class TokenVerdictCache:
+    """In-process кэш вердиктов по sha256 токена.
+
+    Запись живёт до exp токена, но не дольше max_ttl: так отзыв токена
+    становится виден не позднее чем через max_ttl секунд.
+    """
+
+    def __init__(self, max_ttl: int, max_size: int) -> None:
+        self.max_ttl = max_ttl
+        self.max_size = max_size
+        self._verdicts: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[bool]:
+        key = self._key(token)
+        entry = self._verdicts.get(key)
+        if entry is None:
+            return None
+        verdict, expires_at = entry
+        if expires_at <= time.time():
+            del self._verdicts[key]
+            return None
+        self._verdicts.move_to_end(key)
+        return verdict
+
+    def set(self, token: str, verdict: bool, exp: float) -> None:
+        now = time.time()
+        expires_at = min(exp, now + self.max_ttl)
+        if expires_at <= now:
+            return
+        key = self._key(token)
+        self._verdicts[key] = (verdict, expires_at)
+        self._verdicts.move_to_end(key)
+        while len(self._verdicts) > self.max_size:
+            self._verdicts.popitem(last=False)
+
+
+verdicts = TokenVerdictCache(
+    max_ttl=config.AUTH_VERDICT_CACHE_TTL,
+    max_size=config.AUTH_VERDICT_CACHE_SIZE
+)
+
+
+def get_bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+
+async def verify_access_token(
+    authorization: Optional[str],
+    request_id: Optional[str] = None
+) -> bool:
+    token = get_bearer_token(authorization)
+    if token is None:
+        return False
+    verdict = verdicts.get(token)
+    if verdict is not None:
+        return verdict
+    claims = decode_access_token(token)
+    if claims is None:
+        return False  # мусорные токены не кэшируем, чтобы не вытесняли валидные
+    revoked = await is_token_revoked(claims, request_id)
+    if revoked is None:
+        return False
+    verdicts.set(token, not revoked, claims["exp"])
+    return not revoked
@@ -1,9 +1,105 @@
 import abc
-from typing import Any
+import gzip
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+import orjson
 from aioredis import Redis
 
 
+@dataclass
+class CacheEntry:
+    """Закэшированный ответ и его метаданные.
+
+    soft_expire_at - после этой отметки запись устарела, но ещё может
+    отдаваться (stale-while-revalidate), expire_at - после неё запись
+    отдаётся, только если пересчитать ответ не удалось (ES недоступен).
+    Отметки в unix-времени, чтобы одинаково читаться всеми воркерами.
+    etag - хэш содержимого, считается один раз при записи (до сжатия).
+    encoding - "gzip", если payload хранится сжатым, иначе "".
+    headers - заголовки ответа, выставленные view (курсор и т.п.).
+    status - HTTP-статус ответа: 404 у "надгробия" (закэшированного
+    отсутствия объекта), иначе 200.
+    """
+
+    payload: bytes
+    soft_expire_at: float = 0
+    expire_at: float = 0
+    etag: str = field(default="")
+    encoding: str = ""
+    headers: Dict[str, str] = field(default_factory=dict)
+    status: int = 200
+
+    def __post_init__(self) -> None:
+        if not self.etag:
+            self.etag = '"{0}"'.format(
+                hashlib.blake2b(self.payload, digest_size=16).hexdigest()
+            )
+
+    @property
+    def size(self) -> int:
+        return len(self.payload)
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.soft_expire_at
+
+    def is_expired(self) -> bool:
+        return time.time() >= self.expire_at
+
+    def stale_for(self) -> int:
+        return max(0, round(time.time() - self.soft_expire_at))
+
+    def ttl(self) -> float:
+        return self.expire_at - time.time()
+
+    def max_age(self) -> int:
+        return max(0, round(self.soft_expire_at - time.time()))
+
+    def compress(self, min_size: int, level: int = 6) -> None:
+        if self.encoding or len(self.payload) < min_size:
+            return
+        compressed = gzip.compress(self.payload, compresslevel=level)
+        if len(compressed) < len(self.payload):
+            self.payload = compressed
+            self.encoding = "gzip"
+
+    def decoded_payload(self) -> bytes:
+        if self.encoding == "gzip":
+            return gzip.decompress(self.payload)
+        return self.payload
+
+    def dumps(self) -> bytes:
+        # заголовок - одна строка json (orjson не пишет перевод строки),
+        # дальше тело ответа как есть
+        header = orjson.dumps({
+            "soft": self.soft_expire_at,
+            "hard": self.expire_at,
+            "etag": self.etag,
+            "enc": self.encoding,
+            "hdr": self.headers,
+            **({"st": self.status} if self.status != 200 else {}),
+        })
+        return header + b"\n" + self.payload
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CacheEntry":
+        header, _, payload = raw.partition(b"\n")
+        meta = orjson.loads(header)
+        return cls(
+            payload=payload,
+            soft_expire_at=meta["soft"],
+            expire_at=meta["hard"],
+            etag=meta.get("etag", ""),
+            encoding=meta.get("enc", ""),
+            headers=meta.get("hdr", {}),
+            status=meta.get("st", 200),
+        )
+
+
 class BaseCacheStorage:
     __metaclass__ = abc.ABCMeta
 
@@ -16,11 +112,77 @@ class BaseCacheStorage:
         pass
 
     @abc.abstractmethod
-    async def set_data_to_cache(self, cache_key: str, cache_data: str) -> Any:
+    async def get_many_from_cache(
+        self,
+        cache_keys: List[str]
+    ) -> List[Optional[CacheEntry]]:
+        """Записи по ключам (None для промахов) в порядке ключей."""
+
+    @abc.abstractmethod
+    async def set_data_to_cache(
+        self,
+        cache_key: str,
+        cache_data: CacheEntry,
+        tags: Iterable[str] = ()
+    ) -> Any:
+        pass
+
+    @abc.abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> List[str]:
+        """Удаляет записи с любым из тегов, возвращает удалённые ключи."""
+
+    def evict_local(self, cache_keys: Iterable[str]) -> None:
+        """Забыть ключи в памяти процесса (общее хранилище уже почищено)."""
+
+    @abc.abstractmethod
+    async def acquire_lock(self, cache_key: str, expire_ms: int) -> Optional[str]:
+        pass
+
+    @abc.abstractmethod
+    async def release_lock(self, cache_key: str, lock_token: str) -> Any:
         pass
 
 
 class RedisCacheStorage(BaseCacheStorage):
+    """Записи в redis, теги - ZSET "tags:<тег>": ключ записи со временем
+    её исчезновения из redis. Истёкшие ключи вычищаются из тега при каждой
+    записи в него, так что размер тега ограничен живыми записями.
+    """
+
+    LOCK_PREFIX = "lock:"
+    # не "tag:": там остались SET прежнего формата, ZADD по ним - WRONGTYPE
+    TAG_PREFIX = "tags:"
+    # KEYS - теги; ARGV - ключ записи, отметка её исчезновения, сейчас, TTL записи
+    TAG_SCRIPT = """
+        for _, tag in ipairs(KEYS) do
+            redis.call("zadd", tag, ARGV[2], ARGV[1])
+            redis.call("zremrangebyscore", tag, "-inf", ARGV[3])
+            if redis.call("ttl", tag) < tonumber(ARGV[4]) then
+                redis.call("expire", tag, ARGV[4])
+            end
+        end
+        return 0
+    """
+    # KEYS - теги; ARGV - сейчас. Тот же сценарий есть у ETL (etl/etl/cache.py)
+    INVALIDATE_SCRIPT = """
+        local evicted = {}
+        for _, tag in ipairs(KEYS) do
+            for _, key in ipairs(redis.call("zrangebyscore", tag, ARGV[1], "+inf")) do
+                redis.call("del", key)
+                evicted[#evicted + 1] = key
+            end
+            redis.call("del", tag)
+        end
+        return evicted
+    """
+    # удаляем лок, только если он всё ещё наш (мог истечь и достаться другому)
+    RELEASE_LOCK_SCRIPT = """
+        if redis.call("get", KEYS[1]) == ARGV[1] then
+            return redis.call("del", KEYS[1])
+        end
+        return 0
+    """
+
     def __init__(self, redis_async_instantiator) -> None:
         super().__init__()
         self.async_instantiator = redis_async_instantiator
@@ -28,18 +190,224 @@ class RedisCacheStorage(BaseCacheStorage):
     async def async_init(self) -> Any:  # для совместимости с возможными иными движками
         pass
 
-    async def get_data_from_cache(self, cache_key: str) -> Any:
+    async def get_data_from_cache(self, cache_key: str) -> Optional[CacheEntry]:
         redis = await self.async_instantiator()
         redis_cache_data = await redis.get(cache_key)
         redis._release_callback(redis._pool_or_conn)
         if redis_cache_data:
-            return redis_cache_data.decode()
+            return CacheEntry.loads(redis_cache_data)
+
+    async def get_many_from_cache(
+        self,
+        cache_keys: List[str]
+    ) -> List[Optional[CacheEntry]]:
+        if not cache_keys:
+            return []
+        redis = await self.async_instantiator()
+        values = await redis.mget(*cache_keys)
+        redis._release_callback(redis._pool_or_conn)
+        return [CacheEntry.loads(value) if value else None for value in values]
 
-    async def set_data_to_cache(self, cache_key: str, cache_data: str, expire: int = 30) -> Any:
+    async def set_data_to_cache(
+        self,
+        cache_key: str,
+        cache_data: CacheEntry,
+        expire: int = 30,
+        tags: Iterable[str] = ()
+    ) -> Any:
         redis = await self.async_instantiator()
-        await redis.set(
+        pipe = redis.pipeline()
+        pipe.set(
                 cache_key,
-                cache_data.decode(),
+                cache_data.dumps(),
                 expire=expire
             )
+        tag_keys = [self.TAG_PREFIX + tag for tag in tags]
+        if tag_keys:
+            now = int(time.time())
+            pipe.eval(
+                self.TAG_SCRIPT,
+                keys=tag_keys,
+                args=[cache_key, now + expire, now, expire]
+            )
+        await pipe.execute()
         redis._release_callback(redis._pool_or_conn)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> List[str]:
+        tag_keys = [self.TAG_PREFIX + tag for tag in tags]
+        if not tag_keys:
+            return []
+        redis = await self.async_instantiator()
+        cache_keys = await redis.eval(
+            self.INVALIDATE_SCRIPT, keys=tag_keys, args=[int(time.time())]
+        )
+        redis._release_callback(redis._pool_or_conn)
+        return list(dict.fromkeys(cache_key.decode() for cache_key in cache_keys))
+
+    async def acquire_lock(self, cache_key: str, expire_ms: int) -> Optional[str]:
+        lock_token = uuid.uuid4().hex
+        redis = await self.async_instantiator()
+        acquired = await redis.set(
+            self.LOCK_PREFIX + cache_key,
+            lock_token,
+            pexpire=expire_ms,
+            exist=redis.SET_IF_NOT_EXIST
+        )
+        redis._release_callback(redis._pool_or_conn)
+        return lock_token if acquired else None
+
+    async def release_lock(self, cache_key: str, lock_token: str) -> Any:
+        redis = await self.async_instantiator()
+        await redis.eval(
+            self.RELEASE_LOCK_SCRIPT,
+            keys=[self.LOCK_PREFIX + cache_key],
+            args=[lock_token]
+        )
+        redis._release_callback(redis._pool_or_conn)
+
+
+@dataclass
+class TierStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class MemoryLRU:
+    """LRU в памяти процесса, ограниченное суммарным размером значений в байтах."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[CacheEntry, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: CacheEntry, expire: float) -> None:
+        self.delete(key)
+        if expire <= 0 or value.size > self.max_bytes:
+            return
+        self._entries[key] = (value, time.monotonic() + expire)
+        self.size += value.size
+        while self.size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[0].size
+
+
+class TwoTierCacheStorage(BaseCacheStorage):
+    """L1 (in-process LRU) перед L2 (обычно RedisCacheStorage).
+
+    l1_expire должен быть короче TTL в L2; в L1 запись в любом случае
+    не живёт дольше своего expire_at.
+    """
+
+    def __init__(
+        self,
+        backend: BaseCacheStorage,
+        max_bytes: int = 64 * 1024 * 1024,
+        l1_expire: float = 5
+    ) -> None:
+        super().__init__()
+        self.backend = backend
+        self.l1_expire = l1_expire
+        self.l1 = MemoryLRU(max_bytes)
+        self.l1_stats = TierStats()
+        self.l2_stats = TierStats()
+
+    async def async_init(self) -> Any:
+        await self.backend.async_init()
+
+    async def get_data_from_cache(self, cache_key: str) -> Optional[CacheEntry]:
+        cache_data = self.l1.get(cache_key)
+        if cache_data is not None:
+            self.l1_stats.hits += 1
+            return cache_data
+        self.l1_stats.misses += 1
+
+        cache_data = await self.backend.get_data_from_cache(cache_key)
+        if cache_data is None:
+            self.l2_stats.misses += 1
+            return None
+        self.l2_stats.hits += 1
+        self.l1.set(
+            cache_key, cache_data, expire=min(self.l1_expire, cache_data.ttl())
+        )
+        return cache_data
+
+    async def get_many_from_cache(
+        self,
+        cache_keys: List[str]
+    ) -> List[Optional[CacheEntry]]:
+        entries = [self.l1.get(cache_key) for cache_key in cache_keys]
+        missed = [
+            cache_key for cache_key, entry in zip(cache_keys, entries)
+            if entry is None
+        ]
+        self.l1_stats.hits += len(cache_keys) - len(missed)
+        self.l1_stats.misses += len(missed)
+        if not missed:
+            return entries
+
+        # в L2 идём одним запросом за всеми промахами L1
+        from_backend = dict(
+            zip(missed, await self.backend.get_many_from_cache(missed))
+        )
+        for index, cache_key in enumerate(cache_keys):
+            if entries[index] is not None:
+                continue
+            cache_data = from_backend[cache_key]
+            if cache_data is None:
+                self.l2_stats.misses += 1
+                continue
+            self.l2_stats.hits += 1
+            self.l1.set(
+                cache_key, cache_data, expire=min(self.l1_expire, cache_data.ttl())
+            )
+            entries[index] = cache_data
+        return entries
+
+    async def set_data_to_cache(
+        self,
+        cache_key: str,
+        cache_data: CacheEntry,
+        expire: int = 30,
+        tags: Iterable[str] = ()
+    ) -> Any:
+        await self.backend.set_data_to_cache(
+            cache_key, cache_data, expire=expire, tags=tags
+        )
+        self.l1.set(cache_key, cache_data, expire=min(self.l1_expire, expire))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> List[str]:
+        cache_keys = await self.backend.invalidate_tags(tags)
+        self.evict_local(cache_keys)
+        return cache_keys
+
+    def evict_local(self, cache_keys: Iterable[str]) -> None:
+        for cache_key in cache_keys:
+            self.l1.delete(cache_key)
+
+    async def acquire_lock(self, cache_key: str, expire_ms: int) -> Optional[str]:
+        return await self.backend.acquire_lock(cache_key, expire_ms)
+
+    async def release_lock(self, cache_key: str, lock_token: str) -> Any:
+        await self.backend.release_lock(cache_key, lock_token)
+
+    def stats(self) -> dict:
+        return {
+            "l1": {**self.l1_stats.__dict__, "bytes": self.l1.size},
+            "l2": dict(self.l2_stats.__dict__),
+        }
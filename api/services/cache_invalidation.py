@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import aioredis
+import orjson
+
+from core import config
+from core.cache_tags import tags_for_changes
+from services.cache import BaseCacheStorage
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheInvalidationListener:
+    """Подписка на изменения от ETL: {"index": "movies", "ids": [...], "keys": [...]}.
+
+    Записи в redis удаляет сам ETL (один раз на изменение), каждый воркер
+    забывает те же keys в своём L1. Кроме кэша, на изменения индекса можно
+    подписать свои обработчики (перезагрузку каталога жанров и т.п.), а на
+    переподключение к redis - обработчики, которые догоняют пропущенное.
+    """
+
+    def __init__(self, storage: BaseCacheStorage, channel: str) -> None:
+        self.storage = storage
+        self.channel = channel
+        self.redis: Optional[aioredis.Redis] = None
+        self.task: Optional[asyncio.Task] = None
+        self.handlers: Dict[str, List[Callable[[List[str]], Awaitable[None]]]] = {}
+        self.reconnect_handlers: List[Callable[[], Awaitable[None]]] = []
+
+    def on_change(
+        self,
+        index: str,
+        handler: Callable[[List[str]], Awaitable[None]]
+    ) -> None:
+        self.handlers.setdefault(index, []).append(handler)
+
+    def on_reconnect(self, handler: Callable[[], Awaitable[None]]) -> None:
+        self.reconnect_handlers.append(handler)
+
+    async def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        await self._close()
+
+    async def _run(self) -> None:
+        reconnected = False
+        while True:
+            try:
+                # pub/sub занимает соединение целиком, поэтому оно отдельное от пула
+                self.redis = await aioredis.create_redis(
+                    (config.REDIS_HOST, config.REDIS_PORT),
+                    db=config.REDIS_DB,
+                    password=config.REDIS_PASSWORD
+                )
+                channel, = await self.redis.subscribe(self.channel)
+                if reconnected:
+                    await self._catch_up()
+                await self._listen(channel)  # закончится, когда оборвётся соединение
+                logger.warning("cache invalidation channel closed, resubscribing")
+            except (aioredis.RedisError, OSError) as exc:
+                logger.warning("cache invalidation subscription failed: %r", exc)
+            finally:
+                await self._close()
+            reconnected = True
+            await asyncio.sleep(config.CACHE_INVALIDATION_RECONNECT_DELAY)
+
+    async def _close(self) -> None:
+        redis, self.redis = self.redis, None
+        if redis is not None:
+            redis.close()
+            await redis.wait_closed()
+
+    async def _catch_up(self) -> None:
+        # пока подписки не было, сообщения терялись: пусть догонят сами
+        for handler in self.reconnect_handlers:
+            try:
+                await handler()
+            except Exception:
+                logger.exception("cache invalidation reconnect handler failed")
+
+    async def _listen(self, channel: aioredis.Channel) -> None:
+        async for message in channel.iter():
+            try:
+                await self.invalidate(orjson.loads(message))
+            except Exception:
+                logger.exception("cache invalidation failed: %r", message)
+
+    async def invalidate(self, changes: dict) -> None:
+        # сначала in-memory состояние (каталог, фильтры id), потом кэш:
+        # иначе между ними кэш успеет заполниться старыми данными
+        for handler in self.handlers.get(changes["index"], []):
+            try:
+                await handler(changes["ids"])
+            except Exception:
+                logger.exception("%s change handler failed", changes["index"])
+        if "keys" in changes:
+            cache_keys = changes["keys"]
+            self.storage.evict_local(cache_keys)
+        else:  # сообщение ETL старой версии: в redis записи ещё не удалены
+            tags = tags_for_changes(changes["index"], changes["ids"])
+            cache_keys = await self.storage.invalidate_tags(tags)
+        logger.debug(
+            "%s: %d ids changed, %d cache keys evicted",
+            changes["index"], len(changes["ids"]), len(cache_keys)
+        )
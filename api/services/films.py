@@ -1,17 +1,25 @@
 from functools import lru_cache
-import re
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from elasticsearch import AsyncElasticsearch, NotFoundError
-from services.mixins import GetByIDService, ListService, SearchService
+from elasticsearch import AsyncElasticsearch, NotFoundError, RequestError
+from services.mixins import (
+    GetByIDService,
+    GetManyByIDService,
+    ListService,
+    SearchService,
+    SuggestService,
+)
 from fastapi import Depends
 
-from core.elastic_queries_films import (
-    get_filter_genre_query,
-    get_search_film_query,
-)
+from core import messages
+from core.cursor import decode_cursor, encode_cursor
+from core.elastic_queries_films import get_suggest_film_query
+from core.elastic_query_builder import FilmQueryBuilder
 from db.elastic import get_elastic
 from models.film import Film, FilmResponse
+from models.page import FilmPage
+from services.id_filter import id_filters
+from services.mget_loader import mget_loader
 
 
 # review: more SOLID-like: напрашиватся общая идея о функциональных
@@ -19,79 +27,172 @@ from models.film import Film, FilmResponse
 # при этом, с учетом того, что перехода с ElasticSearch на что-то
 # иное в ближайшие N лет явно не планируется, то можно оставить его
 # как есть, не абстрагируя
-class FilmService(GetByIDService, SearchService, ListService):
+class FilmService(
+    GetByIDService,
+    GetManyByIDService,
+    SearchService,
+    SuggestService,
+    ListService
+):
     def __init__(self, elastic: AsyncElasticsearch) -> None:
         self.elastic = elastic
 
-    async def get(self, film_id: str) -> Optional[Film]:
+    async def get(
+        self,
+        film_id: str,
+        fields: Optional[List[str]] = None
+    ) -> Optional[Film]:
+        if not id_filters["movies"].might_contain(film_id):
+            return None
         try:
-            doc = await self.elastic.get('movies', film_id)
-        except NotFoundError:
+            # конкурентные get склеиваются в один mget
+            source = await mget_loader(self.elastic, 'movies').load(film_id, fields)
+        except NotFoundError:  # нет индекса
             return None
-        return Film(**doc["_source"])
+        if source is None:
+            return None
+        return self._film(source, fields)
 
-    async def list(
+    async def get_many(
         self,
-        page_number: int = 0,
-        page_size: int = 0,
-        **kwargs: dict
-    ) -> Optional[List[FilmResponse]]:
+        film_ids: List[str],
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Film]:
+        film_ids = [uuid for uuid in film_ids if id_filters["movies"].might_contain(uuid)]
+        if not film_ids:
+            return {}
         try:
-            query = dict()
-            sort_in_elastic_terms = None
-
-            sort: str = kwargs['sort']
-            filter_genre = kwargs['filter_genre']
-
-            if sort:
-                if sort.startswith("-"):
-                    sort_in_elastic_terms = f"{sort.removeprefix('-')}:desc"
-                elif sort.startswith("_"):
-                    sort_in_elastic_terms = f"{sort.removeprefix('_')}:desc"
-                else:
-                    sort_in_elastic_terms = f"{sort}:asc"
+            data = await self.elastic.mget(
+                body={"ids": film_ids}, index='movies', _source_includes=fields
+            )
+        except NotFoundError:
+            return {}
+        return {
+            doc["_id"]: self._film(doc["_source"], fields)
+            for doc in data["docs"] if doc.get("found")
+        }
 
-            if filter_genre:
-                filter_genre_query = get_filter_genre_query(filter_genre)
-                query.update(filter_genre_query)
+    @staticmethod
+    def _film(source: dict, fields: Optional[List[str]] = None) -> Film:
+        # неполный документ (_source includes) валидацию Film не пройдёт:
+        # данные ETL доверенные, поля проверит модель ответа view
+        if fields is None:
+            return Film(**source)
+        return Film.construct(**source)
 
-            from_ = page_number * page_size - page_number
-            data = await self.elastic.search(
-                body=query,
-                index="movies",
-                sort=sort_in_elastic_terms,
-                from_=from_,
-                size=page_number,
+    async def list(
+        self,
+        page_number: int = 1,
+        page_size: int = 50,
+        fields: Optional[List[str]] = None,
+        **kwargs: dict
+    ) -> Optional[FilmPage]:
+        try:
+            query = FilmQueryBuilder().sort_by(kwargs.get('sort')).fields(fields)
+            if kwargs.get('filter_genre'):
+                query.genre(kwargs['filter_genre'])
+            if kwargs.get('filter_person'):
+                # несуществующую персону отсекаем без запроса в ES
+                if not id_filters["persons"].might_contain(kwargs['filter_person']):
+                    return None
+                query.person(kwargs['filter_person'])
+            return await self._paginate(
+                query, page_number, page_size, kwargs.get('cursor')
             )
         except NotFoundError:
             return None
-        docs = data["hits"]["hits"]
-        return [FilmResponse(**doc["_source"]) for doc in docs]
 
     async def search(
         self,
         string: str,
-        page_number: int = 0,
+        page_number: int = 1,
         page_size: int = 50,
+        fields: Optional[List[str]] = None,
         **kwargs: dict
-    ) -> Optional[List[FilmResponse]]:
+    ) -> Optional[FilmPage]:
         try:
             if not string:
                 return None
+            query = FilmQueryBuilder().text(string).fields(fields)
+            return await self._paginate(
+                query, page_number, page_size, kwargs.get('cursor')
+            )
+        except NotFoundError:
+            return None
 
-            search_query = get_search_film_query(string)
-
-            from_ = page_number * page_size - page_number
+    async def suggest(
+        self,
+        prefix: str,
+        size: int,
+        fields: Optional[List[str]] = None
+    ) -> List[FilmResponse]:
+        try:
             data = await self.elastic.search(
-                body=search_query,
-                index="movies",
-                from_=from_,
-                size=page_number,
+                body=get_suggest_film_query(prefix, size, fields),
+                index="movies"
             )
         except NotFoundError:
-            return None
-        docs = data["hits"]["hits"]
-        return [FilmResponse(**doc["_source"]) for doc in docs]
+            return []
+        return [
+            FilmResponse(**option["_source"])
+            for option in data["suggest"]["films"][0]["options"]
+        ]
+
+    async def _paginate(
+        self,
+        query: FilmQueryBuilder,
+        page_number: int,
+        page_size: int,
+        cursor: Optional[str] = None,
+    ) -> FilmPage:
+        """Страница по номеру (from/size) или по курсору (search_after).
+
+        По последнему документу любой страницы выдаётся курсор на следующую;
+        он помнит хэш сортировки и запроса и с другими не принимается.
+        Без point-in-time: uuid замыкает сортировку, порядок полный и
+        одинаковый на первой и следующих страницах; курсор не держит
+        контекст в ES и не устаревает, пока лежит в кэше.
+        Raises:
+            ValueError: курсор не разобран или выдан для другого запроса
+        """
+        if cursor:
+            state = decode_cursor(cursor)
+            if state.get("query") != query.cursor_key:
+                raise ValueError(messages.INVALID_CURSOR)
+            query.after(state["after"], page_size)
+        else:
+            query.page(page_number, page_size)
+            if query.out_of_window:
+                return FilmPage(items=[])
+
+        data = await self._search(query)
+        hits = data["hits"]["hits"]
+        has_more = len(hits) > query.size
+        hits = hits[:query.size]
+
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor({
+                "after": hits[-1]["sort"],
+                "query": query.cursor_key,
+            })
+        return FilmPage(
+            items=[self._film(doc["_source"], query.source) for doc in hits],
+            next_cursor=next_cursor,
+            has_more=has_more,
+            **FilmPage.total_from_hits(data["hits"]),
+        )
+
+    async def _search(self, query: FilmQueryBuilder) -> dict:
+        try:
+            return await self.elastic.search(
+                body=query.build(), index="movies", request_cache=query.request_cache
+            )
+        except RequestError as exc:
+            if query.search_after is None:
+                raise
+            # значения курсора не того типа, что поля сортировки
+            raise ValueError(messages.INVALID_CURSOR) from exc
 
 
 @lru_cache
@@ -1,24 +1,134 @@
+import asyncio
+import hashlib
+import logging
 from functools import lru_cache
-from typing import Optional, List
+from typing import Dict, Optional, List
 
-from elasticsearch import AsyncElasticsearch, NotFoundError
+import orjson
+from elasticsearch import AsyncElasticsearch, ElasticsearchException, NotFoundError
 from fastapi import Depends
 
-from db.elastic import get_elastic
+from core import config
+from core.elastic_queries_films import get_query_for_match_all
+from db.elastic import CircuitOpenError
 from models.genre import GenreResponse
+from services.id_filter import id_filters
 from services.mixins import GetByIDService, ListService
 
 
-class GenreService(GetByIDService, ListService):
-    def __init__(self, elastic: AsyncElasticsearch) -> None:
+logger = logging.getLogger(__name__)
+
+
+class GenreCatalog:
+    """Все жанры в памяти процесса.
+
+    Жанров немного и меняются они редко, поэтому список, сведения о жанре
+    и проверка filter[genre] обходятся без ES и redis. Каталог грузится при
+    старте, обновляется раз в refresh_interval секунд и по сигналу ETL
+    об изменении индекса genres (см. CacheInvalidationListener).
+    etag - версия каталога (хэш содержимого), пересчитывается при загрузке;
+    по ней ручки жанров отвечают 304 без сериализации ответа.
+    """
+
+    def __init__(self, refresh_interval: float, max_size: int) -> None:
+        self.refresh_interval = refresh_interval
+        self.max_size = max_size
+        self.genres: Dict[str, GenreResponse] = {}
+        self.etag = ""
+        self.loaded = False
+        self.elastic: Optional[AsyncElasticsearch] = None
+        self.task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def start(self, elastic: AsyncElasticsearch) -> None:
         self.elastic = elastic
+        try:
+            await self.refresh()
+        except ElasticsearchException:
+            # не валим старт API: каталог догрузится при первом обращении
+            logger.exception("genre catalog initial load failed")
+        self.task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+    async def refresh(self) -> None:
+        if self._lock is None:  # создаём в работающем event loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                data = await self.elastic.search(
+                    body=get_query_for_match_all(),
+                    index="genres",
+                    size=self.max_size,
+                )
+            except NotFoundError:
+                data = {"hits": {"hits": []}}
+            genres = [GenreResponse(**genre["_source"]) for genre in data["hits"]["hits"]]
+            # новый словарь целиком: читатели никогда не видят половину каталога
+            catalog = {
+                genre.uuid: genre
+                for genre in sorted(genres, key=lambda genre: genre.name)
+            }
+            version = hashlib.blake2b(
+                orjson.dumps([genre.dict() for genre in catalog.values()]),
+                digest_size=16
+            )
+            self.genres, self.etag = catalog, '"{0}"'.format(version.hexdigest())
+            self.loaded = True
+        logger.debug("genre catalog loaded: %d genres", len(self.genres))
+
+    async def on_change(self, genre_ids: List[str]) -> None:
+        await self.refresh()
+
+    async def ready(self) -> bool:
+        if not self.loaded and self.elastic is not None:
+            try:
+                await self.refresh()
+            except ElasticsearchException:
+                logger.exception("genre catalog load failed")
+        return self.loaded
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("genre catalog refresh failed")
+
+    def get(self, genre_id: str) -> Optional[GenreResponse]:
+        return self.genres.get(genre_id)
+
+    def list(self) -> List[GenreResponse]:
+        return list(self.genres.values())
+
+
+genre_catalog = GenreCatalog(
+    refresh_interval=config.GENRE_CATALOG_REFRESH_INTERVAL,
+    max_size=config.GENRE_CATALOG_MAX_SIZE
+)
+
+
+def get_genre_catalog() -> GenreCatalog:
+    return genre_catalog
+
+
+class GenreService(GetByIDService, ListService):
+    def __init__(self, catalog: GenreCatalog) -> None:
+        self.catalog = catalog
+
+    @property
+    def etag(self) -> str:
+        return self.catalog.etag
 
     async def get(self, genre_id: str) -> Optional[GenreResponse]:
-        try:
-            doc = await self.elastic.get("genres", genre_id)
-        except NotFoundError:
+        # без фильтра незнакомый id мог бы запустить загрузку каталога из ES
+        if not id_filters["genres"].might_contain(genre_id):
             return None
-        return GenreResponse(**doc["_source"])
+        await self._ensure_ready()
+        return self.catalog.get(genre_id)
 
     async def list(
         self,
@@ -26,22 +136,17 @@ class GenreService(GetByIDService, ListService):
         page_size: int = 0,
         **kwargs: dict
     ) -> List[GenreResponse]:
-        data = None
-        try:
-            data = await self.elastic.search(
-                body="{}",
-                index="genres",
-            )
-        except NotFoundError:
-            return None
-        if data is None:
-            return None
-        return [GenreResponse(**genre["_source"])
-                for genre in data['hits']['hits']]
+        await self._ensure_ready()
+        return self.catalog.list()
+
+    async def _ensure_ready(self) -> None:
+        # каталог ни разу не загрузился (ES недоступен): это 503, а не 404
+        if not await self.catalog.ready():
+            raise CircuitOpenError("genre catalog is not loaded")
 
 
 @lru_cache
 def get_service(
-    elastic: AsyncElasticsearch = Depends(get_elastic),
+    catalog: GenreCatalog = Depends(get_genre_catalog),
 ) -> GenreService:
-    return GenreService(elastic)
+    return GenreService(catalog)
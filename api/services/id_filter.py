@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import orjson
+
+from core import config
+from db.redis import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+# формат ключей и хэширование совпадают с etl/etl/bloom.py
+KEY_PREFIX = "bloom"
+INDEXES = ("movies", "persons", "genres")
+
+
+def positions(doc_id: str, size: int, hashes: int) -> Iterable[int]:
+    digest = hashlib.blake2b(doc_id.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "big")
+    h2 = int.from_bytes(digest[8:], "big") | 1
+    return ((h1 + i * h2) % size for i in range(hashes))
+
+
+class IdFilter:
+    """Bloom-фильтр id одного индекса, собранный ETL.
+
+    "Нет" - точно нет документа, "да" - возможно есть. Пока фильтр не
+    загружен (ETL ещё не прошёл все документы, redis пуст), отвечает "да":
+    ложные 404 хуже лишнего запроса в ES.
+    """
+
+    def __init__(self, index: str) -> None:
+        self.index = index
+        self.key = f"{KEY_PREFIX}:{index}"
+        self.size = 0
+        self.hashes = 0
+        self.bits: Optional[bytearray] = None
+        self.rejected = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.bits is not None
+
+    def load(self, meta: Optional[bytes], bits: Optional[bytes]) -> None:
+        if meta is None:
+            self.bits = None
+            return
+        params = orjson.loads(meta)
+        bits = bytearray(bits or b"")
+        # redis не хранит хвост из нулей, дополняем до полного размера
+        bits.extend(bytes((params["size"] + 7) // 8 - len(bits)))
+        self.size, self.hashes, self.bits = params["size"], params["hashes"], bits
+
+    def might_contain(self, doc_id: str) -> bool:
+        bits = self.bits
+        if bits is None:
+            return True
+        # порядок битов как у SETBIT: нулевой бит - старший в первом байте
+        for bit in positions(doc_id, self.size, self.hashes):
+            if not bits[bit >> 3] & (0x80 >> (bit & 7)):
+                self.rejected += 1
+                return False
+        return True
+
+    def add(self, doc_ids: Iterable[str]) -> None:
+        bits = self.bits
+        if bits is None:
+            return
+        for doc_id in doc_ids:
+            for bit in positions(doc_id, self.size, self.hashes):
+                bits[bit >> 3] |= 0x80 >> (bit & 7)
+
+    async def on_change(self, doc_ids: List[str]) -> None:
+        # ETL ставит биты в redis до публикации, тут - догоняем локальную копию
+        self.add(doc_ids)
+
+    def stats(self) -> dict:
+        return {"loaded": self.loaded, "size": self.size, "rejected": self.rejected}
+
+
+class IdFilters:
+    """Фильтры id всех индексов: загрузка при старте и полное обновление
+    раз в refresh_interval секунд; между обновлениями новые id добавляются
+    по сигналу ETL (см. CacheInvalidationListener)."""
+
+    def __init__(self, indexes: Iterable[str], refresh_interval: float) -> None:
+        self.filters: Dict[str, IdFilter] = {index: IdFilter(index) for index in indexes}
+        self.refresh_interval = refresh_interval
+        self.task: Optional[asyncio.Task] = None
+
+    def __getitem__(self, index: str) -> IdFilter:
+        return self.filters[index]
+
+    def __iter__(self):
+        return iter(self.filters.values())
+
+    async def start(self) -> None:
+        try:
+            await self.refresh()
+        except Exception:
+            # без фильтров API работает как раньше, только без отсечения
+            logger.exception("id filters initial load failed")
+        self.task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+
+    async def refresh(self) -> None:
+        redis = get_redis()
+        for id_filter in self:
+            meta = await redis.get(id_filter.key + ":meta")
+            bits = await redis.get(id_filter.key) if meta is not None else None
+            id_filter.load(meta, bits)
+            logger.debug("id filter %s loaded: %s", id_filter.index, id_filter.loaded)
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("id filters refresh failed")
+
+    def stats(self) -> dict:
+        return {id_filter.index: id_filter.stats() for id_filter in self}
+
+
+id_filters = IdFilters(INDEXES, refresh_interval=config.ID_FILTER_REFRESH_INTERVAL)
@@ -0,0 +1,101 @@
+import asyncio
+import weakref
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+from core import config
+
+
+class MgetLoader:
+    """Склейка одиночных get по индексу в один mget (как DataLoader).
+
+    Запросы id копятся window секунд (или до max_batch id) и разрешаются
+    одним mget; один id, запрошенный несколько раз, запрашивается один раз.
+    Ошибки отдельных документов (нет документа, шард недоступен) дают None,
+    ошибка всего mget (ES недоступен) достаётся всем ждущим - её обработают
+    так же, как ошибку одиночного get. У каждого документа в mget свой
+    _source, поэтому запросы с разными наборами полей склеиваются тоже.
+    """
+
+    def __init__(
+        self,
+        elastic: AsyncElasticsearch,
+        index: str,
+        window: float,
+        max_batch: int
+    ) -> None:
+        self.elastic = elastic
+        self.index = index
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[Tuple[str, Optional[Tuple[str, ...]]], asyncio.Future] = {}
+        self._handle: Optional[asyncio.Handle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, doc_id: str, fields: Optional[List[str]] = None) -> Optional[dict]:
+        """_source документа (только fields, если заданы) или None."""
+        key = (doc_id, tuple(fields) if fields else None)
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._handle is None:
+                self._handle = loop.call_later(self.window, self._dispatch)
+        # отмена одного ждущего не должна отменять ответ остальным
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._fetch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(
+        self,
+        batch: Dict[Tuple[str, Optional[Tuple[str, ...]]], asyncio.Future]
+    ) -> None:
+        docs = [
+            {"_id": doc_id, "_source": list(fields)} if fields else {"_id": doc_id}
+            for doc_id, fields in batch
+        ]
+        try:
+            data = await self.elastic.mget(body={"docs": docs}, index=self.index)
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+                    future.exception()  # ждущих может не остаться
+            return
+        # ES отвечает в порядке запроса; id может повторяться с разными полями
+        for future, doc in zip(batch.values(), data["docs"]):
+            if future.done():
+                continue
+            future.set_result(doc["_source"] if doc.get("found") else None)
+
+
+# event loop -> {(id клиента, индекс): загрузчик}; у каждого цикла свои
+# загрузчики, futures нельзя делить между циклами
+_loaders: "weakref.WeakKeyDictionary[Any, Dict[Tuple[int, str], MgetLoader]]" = weakref.WeakKeyDictionary()
+
+
+def mget_loader(elastic: AsyncElasticsearch, index: str) -> MgetLoader:
+    loaders = _loaders.setdefault(asyncio.get_running_loop(), {})
+    key = (id(elastic), index)
+    loader = loaders.get(key)
+    if loader is None or loader.elastic is not elastic:
+        loader = loaders[key] = MgetLoader(
+            elastic,
+            index,
+            window=config.ES_MGET_WINDOW,
+            max_batch=config.ES_MGET_MAX_BATCH
+        )
+    return loader
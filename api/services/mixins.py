@@ -1,13 +1,37 @@
 import abc
 from abc import ABCMeta
+from typing import Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+
+def source_fields(model: Type[BaseModel]) -> List[str]:
+    """Поля документа ES, нужные для модели ответа (для _source includes)."""
+    return [field.alias for field in model.__fields__.values()]
 
 
 class GetByIDService(metaclass=ABCMeta):
     @abc.abstractmethod
-    def get(self, uuid: str):
+    def get(self, uuid: str, fields: Optional[List[str]] = None):
         pass
 
 
+class GetManyByIDService(metaclass=ABCMeta):
+    @abc.abstractmethod
+    def get_many(
+        self,
+        uuids: List[str],
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, BaseModel]:
+        """Найденные объекты по id (одним запросом), отсутствующих нет в ответе."""
+
+
+class SuggestService(metaclass=ABCMeta):
+    @abc.abstractmethod
+    def suggest(self, prefix: str, size: int, fields: Optional[List[str]] = None):
+        """Подсказки по префиксу (completion suggester)."""
+
+
 class SearchService(metaclass=ABCMeta):
     @abc.abstractmethod
     def search(
@@ -15,6 +39,7 @@ class SearchService(metaclass=ABCMeta):
             string: str,
             page_number: int = 0,
             page_size: int = 50,
+            fields: Optional[List[str]] = None,
             **kwargs: dict
     ):
         pass
@@ -26,6 +51,7 @@ class ListService(metaclass=ABCMeta):
             self,
             page_number: int = 0,
             page_size: int = 50,
+            fields: Optional[List[str]] = None,
             **kwargs: dict
     ):
         pass
@@ -1,122 +1,168 @@
 from functools import lru_cache
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 
+from core import config
 from db.elastic import get_elastic
+from models.film import PersonResponse
+from models.page import PersonPage
 from models.person import Person
-from models.film import PersonResponse, FilmResponse
 from core.elastic_queries_persons import (
-    get_persons_movies_query,
-    get_persons_search_query
+    get_persons_search_query,
+    get_suggest_persons_query,
 )
-from services.mixins import GetByIDService, SearchService
+from services.id_filter import id_filters
+from services.mget_loader import mget_loader
+from services.mixins import (
+    GetByIDService,
+    GetManyByIDService,
+    SearchService,
+    SuggestService,
+)
+
+
+# поле модели -> поле документа persons, где они называются по-разному
+PERSON_SOURCE_FIELDS = {"film_ids": "films"}
+
+
+def person_source_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    return [PERSON_SOURCE_FIELDS.get(field, field) for field in fields]
 
 
-# review from MatMerd: считаю, что нужно чуть более понятное название переменным в функции appends_films_to person
-class PersonService(GetByIDService, SearchService):
+class PersonService(GetByIDService, GetManyByIDService, SearchService, SuggestService):
     def __init__(self, elastic: AsyncElasticsearch) -> None:
         self.elastic = elastic
 
-    async def get(self, person_id: str) -> Optional[PersonResponse]:
-        person, films = None, None
+    async def get(
+        self,
+        person_id: str,
+        fields: Optional[List[str]] = None
+    ) -> Optional[PersonResponse]:
+        if not id_filters["persons"].might_contain(person_id):
+            return None
         try:
-            person = await self._person_from_elastic(person_id, raw=True)
-            if person is None:
-                return None
-            films = await self.elastic.search(
-                body=get_persons_movies_query([person_id]),
-                index="movies",
-                from_=0,
-                size=10000,  # да, мы поместимся :)
+            # конкурентные get склеиваются в один mget
+            source = await mget_loader(self.elastic, "persons").load(
+                person_id, person_source_fields(fields)
             )
-        except NotFoundError:
+        except NotFoundError:  # нет индекса
             return None
-        films = [film['_source'] for film in films['hits']['hits']]
-        person['film_ids'] = films
-        return PersonResponse(**person)
+        if source is None:
+            return None
+        return self._person_from_source(source, fields)
+
+    async def get_many(
+        self,
+        person_ids: List[str],
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, PersonResponse]:
+        person_ids = [uuid for uuid in person_ids if id_filters["persons"].might_contain(uuid)]
+        if not person_ids:
+            return {}
+        try:
+            data = await self.elastic.mget(
+                body={"ids": person_ids},
+                index="persons",
+                _source_includes=person_source_fields(fields)
+            )
+        except NotFoundError:
+            return {}
+        return {
+            doc["_id"]: self._person_from_source(doc["_source"], fields)
+            for doc in data["docs"] if doc.get("found")
+        }
 
     async def search(
             self,
             search_text: str,
             page_number: int = 0,
             page_size: int = 50,
+            fields: Optional[List[str]] = None,
             **kwargs: dict
-    ) -> Optional[List[PersonResponse]]:
+    ) -> Optional[PersonPage]:
         try:
             if not search_text:
                 return None
             persons = await self._paginate_persons_from_elastic(
                 page_number,
                 page_size,
-                search_text=search_text
+                search_text=search_text,
+                fields=fields
             )
-            if not persons:
+            if not persons or not persons.items:
                 return None
         except NotFoundError:
             return None
         return persons
 
-    async def _person_from_elastic(
+    async def suggest(
             self,
-            person_id: str,
-            raw: bool = False
-    ) -> Optional[Person]:
+            prefix: str,
+            size: int,
+            fields: Optional[List[str]] = None
+    ) -> List[Person]:
         try:
-            doc = await self.elastic.get("persons", person_id)
+            data = await self.elastic.search(
+                body=get_suggest_persons_query(prefix, size, person_source_fields(fields)),
+                index="persons"
+            )
         except NotFoundError:
-            return None
-        return Person(**doc["_source"]) if not raw else doc["_source"]
-
-    def _append_films_to_persons(self, persons_data: list, films: list):
-        person_ids_2_movies_ids_set, movies_ids_2_movie_object = {}, {}
-        for film in films:
-            movies_ids_2_movie_object[film['uuid']] = film
-            for roles in ["actors", "directors", "writers"]:
-                for entry in film[roles]:
-                    pid = entry['uuid']
-                    if pid not in person_ids_2_movies_ids_set:
-                        person_ids_2_movies_ids_set[pid] = set()
-                    person_ids_2_movies_ids_set[pid].add(film['uuid'])
-        for person in persons_data:
-            mids = list(person_ids_2_movies_ids_set[person['uuid']])
-            person['film_ids'] = [movies_ids_2_movie_object[mid] for mid in mids]
+            return []
+        model = Person if fields is None else Person.construct
+        return [
+            model(**option["_source"])
+            for option in data["suggest"]["persons"][0]["options"]
+        ]
+
+    @staticmethod
+    def _person_from_source(
+        source: dict,
+        fields: Optional[List[str]] = None
+    ) -> PersonResponse:
+        # фильмы персоны (с ролями) денормализованы в документ ETL-ем
+        if "films" in source:
+            source["film_ids"] = source.pop("films")
+        if fields is None:
+            return PersonResponse(**source)
+        # неполный документ: поля проверит модель ответа view
+        return PersonResponse.construct(**source)
 
     async def _paginate_persons_from_elastic(
             self,
             page: int,
             size: int,
             search_text: str = None,
-    ) -> List[PersonResponse]:
+            fields: Optional[List[str]] = None,
+    ) -> PersonPage:
         try:
             search_query = get_persons_search_query(search_text)
+            if fields is not None:
+                search_query["_source"] = person_source_fields(fields)
             from_ = size * (page - 1 if page - 1 > 0 else 0)
             # TODO: сортирвка для единого порядка следования данных
             data = await self.elastic.search(
-                body=search_query,
+                body={**search_query, "track_total_hits": config.ES_TRACK_TOTAL_HITS},
                 index="persons",
                 from_=from_,
-                size=size,
+                size=size + 1,  # лишний документ - признак следующей страницы
             )
             if data is None:
                 return None
-            persons = [person['_source'] for person in data['hits']['hits']]
-            person_ids = [person['uuid'] for person in persons]
-            films = await self.elastic.search(
-                body=get_persons_movies_query(person_ids),
-                index="movies",
-                from_=0,
-                size=10000,  # лимитировать page size, чтобы уместиться
-            )
-            if films is None:
-                films = []
-            else:
-                films = [film['_source'] for film in films['hits']['hits']]
-            self._append_films_to_persons(persons, films)
         except NotFoundError:
             return None
-        return [PersonResponse(**person) for person in persons]
+        hits = data['hits']['hits']
+        return PersonPage(
+            items=[
+                self._person_from_source(person['_source'], fields)
+                for person in hits[:size]
+            ],
+            has_more=len(hits) > size,
+            **PersonPage.total_from_hits(data['hits']),
+        )
 
 
 @lru_cache
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from http import HTTPStatus
+from pathlib import Path
+
+import httpx
+import jwt
+import pytest
+import yaml
+
+from core import config
+from services import auth
+
+
+def make_token(key=config.JWT_SECRET_KEY, algorithm=config.JWT_ALGORITHM, **claims):
+    payload = {"sub": "user", "jti": "jti-1", "exp": int(time.time()) + 600, "type": "access"}
+    payload.update(claims)
+    return jwt.encode({k: v for k, v in payload.items() if v is not None}, key, algorithm=algorithm)
+
+
+def test_decode_valid_access_token():
+    claims = auth.decode_access_token(make_token())
+    assert claims["sub"] == "user"
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        make_token(exp=int(time.time()) - 10),  # истёк
+        make_token(key="forged"),  # подписан не тем ключом
+        make_token(algorithm="HS512"),  # не тот алгоритм
+        make_token(type="refresh"),  # refresh не даёт доступа к API
+        make_token(jti=None),  # нет обязательного claim
+        jwt.encode({"sub": "user", "jti": "j", "exp": int(time.time()) + 600}, None, algorithm="none"),
+        "not-a-token",
+    ],
+)
+def test_decode_rejects_token(token):
+    assert auth.decode_access_token(token) is None
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, expire=None):
+        self.data[key] = value
+
+
+class FakeAuthClient:
+    def __init__(self, status=HTTPStatus.OK, body=None, error=None):
+        self.status = status
+        self.body = body
+        self.error = error
+        self.requests = []
+
+    async def get(self, url, headers=None):
+        self.requests.append((url, headers))
+        if self.error is not None:
+            raise self.error
+        if isinstance(self.body, bytes):
+            return httpx.Response(self.status, content=self.body)
+        return httpx.Response(self.status, json=self.body)
+
+
+def check_revoked(monkeypatch, client, request_id=None):
+    redis = FakeRedis()
+    monkeypatch.setattr(auth, "get_redis", lambda: redis)
+    monkeypatch.setattr(auth, "get_auth_client", lambda: client)
+    claims = auth.decode_access_token(make_token())
+    return asyncio.run(auth.is_token_revoked(claims, request_id)), redis
+
+
+def test_token_status_endpoint_matches_auth_spec():
+    # путь и метод - те, что auth действительно публикует (connexion по auth.yaml)
+    spec_path = Path(__file__).parents[2] / "auth" / "openapi" / "auth.yaml"
+    if not spec_path.exists():
+        pytest.skip("auth service sources are not available")
+    spec = yaml.safe_load(spec_path.read_text())
+    path = auth.TOKEN_STATUS_URL[len(spec["basePath"]):]
+
+    assert auth.TOKEN_STATUS_URL.startswith(spec["basePath"] + "/")
+    operation = spec["paths"][path]["get"]
+    assert [param["name"] for param in operation.get("parameters", [])] == ["jti"]
+    assert "body" not in [param["in"] for param in operation.get("parameters", [])]
+
+
+def test_revocation_request(monkeypatch):
+    client = FakeAuthClient(body={"revoked": False})
+
+    check_revoked(monkeypatch, client, request_id="req-1")
+    check_revoked(monkeypatch, client)
+
+    (url, headers), (_, generated) = client.requests
+    assert url == "/api/v1/token_status/jti-1"
+    assert headers == {"X-Request-Id": "req-1"}
+    # auth отвергает запросы без X-Request-Id
+    assert generated["X-Request-Id"]
+
+
+@pytest.mark.parametrize(
+    "status, body, verdict",
+    [
+        (HTTPStatus.OK, {"revoked": False}, False),
+        (HTTPStatus.OK, {"revoked": True}, True),
+        (HTTPStatus.OK, {"msg": "unexpected"}, None),
+        (HTTPStatus.OK, {"revoked": "no"}, None),
+        (HTTPStatus.OK, b"<html>", None),
+        (HTTPStatus.NOT_FOUND, {"revoked": False}, None),
+        (HTTPStatus.TOO_MANY_REQUESTS, None, None),
+        (HTTPStatus.INTERNAL_SERVER_ERROR, None, None),
+        (HTTPStatus.BAD_GATEWAY, b"bad gateway", None),
+    ],
+)
+def test_revocation_verdict(monkeypatch, status, body, verdict):
+    revoked, redis = check_revoked(monkeypatch, FakeAuthClient(status, body))
+
+    assert revoked is verdict
+    # кэшируется только настоящий вердикт
+    cached = redis.data.get(auth.REVOKED_KEY_PREFIX + "jti-1")
+    assert cached == {True: auth.REVOKED, False: auth.NOT_REVOKED, None: None}[verdict]
+
+
+def test_revocation_auth_unreachable(monkeypatch):
+    client = FakeAuthClient(error=httpx.ConnectError("down"))
+
+    revoked, redis = check_revoked(monkeypatch, client)
+
+    assert revoked is None
+    assert redis.data == {}
@@ -0,0 +1,104 @@
+import asyncio
+
+from core import config
+from services import cache_invalidation
+from services.cache import CacheEntry, TwoTierCacheStorage
+
+
+class Backend:
+    def __init__(self):
+        self.invalidated = []
+
+    async def async_init(self):
+        pass
+
+    async def invalidate_tags(self, tags):
+        self.invalidated.append(list(tags))
+        return ["stale-key"]
+
+
+def make_storage():
+    storage = TwoTierCacheStorage(Backend(), l1_expire=60)
+    for key in ("evicted", "kept", "stale-key"):
+        storage.l1.set(key, CacheEntry(payload=b"{}"), expire=60)
+    return storage
+
+
+def test_invalidate_evicts_only_l1_when_etl_sent_keys():
+    storage = make_storage()
+    listener = cache_invalidation.CacheInvalidationListener(storage, "channel")
+    changed = []
+
+    async def handler(ids):
+        changed.extend(ids)
+
+    listener.on_change("movies", handler)
+    asyncio.run(listener.invalidate({"index": "movies", "ids": ["f1"], "keys": ["evicted"]}))
+
+    assert changed == ["f1"]
+    assert storage.backend.invalidated == []  # redis уже почистил ETL
+    assert storage.l1.get("evicted") is None
+    assert storage.l1.get("kept") is not None
+
+
+def test_invalidate_message_without_keys():
+    storage = make_storage()
+    listener = cache_invalidation.CacheInvalidationListener(storage, "channel")
+
+    asyncio.run(listener.invalidate({"index": "movies", "ids": ["f1"]}))
+
+    assert storage.backend.invalidated == [["film:f1", "film:list"]]
+    assert storage.l1.get("stale-key") is None
+
+
+class ClosedChannel:
+    def iter(self):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration  # соединение оборвалось
+
+
+class FakeRedis:
+    def __init__(self):
+        self.closed = False
+
+    async def subscribe(self, channel):
+        return [ClosedChannel()]
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+def test_listener_resubscribes_after_disconnect(monkeypatch):
+    connections = []
+    caught_up = []
+
+    async def create_redis(*args, **kwargs):
+        connections.append(FakeRedis())
+        return connections[-1]
+
+    async def catch_up():
+        caught_up.append(1)
+
+    monkeypatch.setattr(cache_invalidation.aioredis, "create_redis", create_redis)
+    monkeypatch.setattr(config, "CACHE_INVALIDATION_RECONNECT_DELAY", 0.001)
+    listener = cache_invalidation.CacheInvalidationListener(make_storage(), "channel")
+    listener.on_reconnect(catch_up)
+
+    async def main():
+        await listener.start()
+        await asyncio.sleep(0.05)
+        await listener.stop()
+
+    asyncio.run(main())
+
+    assert len(connections) > 1
+    assert caught_up  # после переподключения догоняем пропущенное
+    assert all(redis.closed for redis in connections)
@@ -0,0 +1,77 @@
+import hashlib
+import json
+from typing import Optional
+
+from fastapi import BackgroundTasks, Depends, Query, Request, Response
+
+from core.cache_keys import (
+    CACHE_KEY_DIGEST_SIZE,
+    CACHE_KEY_NAMESPACE,
+    CACHE_KEY_VERSION,
+    CacheKeyBuilder,
+)
+
+
+def get_service():
+    return None
+
+
+async def search_films(
+    query: str,
+    sort: Optional[str] = Query(None),
+    page: Optional[int] = Query(1, alias="page[number]"),
+    fields: Optional[str] = Query(None),
+    film_service: object = Depends(get_service),
+    request: Request = None,
+    response: Response = None,
+    tasks: BackgroundTasks = None,
+) -> list:
+    return []
+
+
+build_key = CacheKeyBuilder(search_films)
+
+
+def key(*args, **kwargs):
+    return build_key(args, kwargs)
+
+
+def test_injected_params_are_not_part_of_key():
+    assert [name for name, _ in build_key.params] == ["query", "sort", "page", "fields"]
+    assert key(query="star", film_service=object(), request=object()) == key(
+        query="star", film_service=object(), response=object(), tasks=object()
+    )
+
+
+def test_argument_order_and_passing_style_do_not_matter():
+    assert key(query="star", sort="title", page=2) == key(page=2, sort="title", query="star")
+    assert key("star", "title", 2) == key(query="star", sort="title", page=2)
+
+
+def test_defaults_are_resolved():
+    # Query(1) - то же, что явная первая страница; Query(None) - то же, что None
+    assert key(query="star") == key(query="star", page=1, sort=None, fields=None)
+    assert key(query="star") != key(query="star", page=2)
+
+
+def test_query_is_normalized():
+    assert key(query="  Star \t WARS ") == key(query="star wars")
+    assert key(query="star wars") != key(query="star trek")
+
+
+def test_fields_are_normalized():
+    assert key(query="star", fields="title,imdb_rating") == key(query="star", fields=" imdb_rating,title,title")
+    assert key(query="star", fields=",") == key(query="star")
+    assert key(query="star", fields="title") != key(query="star", fields="uuid")
+
+
+def test_key_format():
+    # тот же дайджест считает tests/functional/utils/get_cache_key
+    values = ["звёздные войны", None, 1, "imdb_rating,title"]
+    digest = hashlib.sha256(
+        json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode()
+    ).hexdigest()[:CACHE_KEY_DIGEST_SIZE]
+
+    assert key(query="Звёздные  Войны", fields="title,imdb_rating") == (
+        f"{CACHE_KEY_NAMESPACE}:{CACHE_KEY_VERSION}:search_films:{digest}"
+    )
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from elasticsearch import RequestError
+
+from core.cursor import encode_cursor
+from services.films import FilmService
+
+
+class Elastic:
+    def __init__(self, error=None):
+        self.error = error
+        self.bodies = []
+
+    async def search(self, body, **kwargs):
+        self.bodies.append(body)
+        if self.error is not None and "search_after" in body:
+            raise self.error
+        films = [
+            {"uuid": "f1", "title": "One", "imdb_rating": 7.0},
+            {"uuid": "f2", "title": "Two", "imdb_rating": 8.0},
+        ]
+        sort_fields = [next(iter(clause)) for clause in body["sort"]]
+        return {"hits": {
+            "total": {"value": 2, "relation": "eq"},
+            "hits": [
+                {"_source": film, "sort": [film.get(field.split(".")[0]) for field in sort_fields]}
+                for film in films
+            ],
+        }}
+
+
+def list_films(service, **kwargs):
+    return asyncio.run(service.list(
+        page_size=1, fields=["uuid", "title", "imdb_rating"], **kwargs
+    ))
+
+
+def test_cursor_continues_same_query():
+    elastic = Elastic()
+    service = FilmService(elastic)
+
+    page = list_films(service, sort="-imdb_rating")
+    list_films(service, sort="-imdb_rating", cursor=page.next_cursor)
+
+    assert elastic.bodies[-1]["search_after"] == [7.0, "f1"]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},  # курсор от сортировки по рейтингу без сортировки
+        {"sort": "title"},
+        {"sort": "-imdb_rating", "filter_genre": "g1"},
+    ],
+)
+def test_cursor_rejected_for_other_query(kwargs):
+    service = FilmService(Elastic())
+    cursor = list_films(service, sort="-imdb_rating").next_cursor
+
+    with pytest.raises(ValueError):
+        list_films(service, cursor=cursor, **kwargs)
+
+
+def test_hand_made_cursor_rejected():
+    elastic = Elastic()
+    service = FilmService(elastic)
+
+    with pytest.raises(ValueError):
+        list_films(service, cursor=encode_cursor({"after": [1, 2, 3]}))
+    assert elastic.bodies == []
+
+
+def test_cursor_values_rejected_by_elastic():
+    # число значений и хэш запроса верные, но ES не принял их тип
+    service = FilmService(Elastic(error=RequestError(400, "parsing_exception", {})))
+    cursor = list_films(service, sort="-imdb_rating").next_cursor
+
+    with pytest.raises(ValueError):
+        list_films(service, sort="-imdb_rating", cursor=cursor)
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from elasticsearch import ConnectionError
+
+from db.elastic import CircuitOpenError
+from services.genres import GenreCatalog, GenreService
+
+
+class Elastic:
+    def __init__(self, genres):
+        self.genres = genres
+
+    async def search(self, **kwargs):
+        return {"hits": {"hits": [{"_source": genre} for genre in self.genres]}}
+
+
+def load(genres):
+    catalog = GenreCatalog(refresh_interval=300, max_size=100)
+    catalog.elastic = Elastic(genres)
+    asyncio.run(catalog.refresh())
+    return catalog
+
+
+def test_catalog_etag_follows_content():
+    drama = {"uuid": "g1", "name": "Drama"}
+    comedy = {"uuid": "g2", "name": "Comedy"}
+
+    catalog = load([drama, comedy])
+    assert catalog.etag.startswith('"') and catalog.etag.endswith('"')
+    # порядок выдачи ES не меняет версию, состав - меняет
+    assert load([comedy, drama]).etag == catalog.etag
+    assert load([drama]).etag != catalog.etag
+    assert load([drama, {"uuid": "g2", "name": "Comedies"}]).etag != catalog.etag
+
+
+def test_never_loaded_catalog_is_unavailable_not_empty():
+    class Down:
+        async def search(self, **kwargs):
+            raise ConnectionError("N/A", "elasticsearch is down", None)
+
+    catalog = GenreCatalog(refresh_interval=300, max_size=100)
+    catalog.elastic = Down()
+    service = GenreService(catalog)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(service.list())
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(service.get("g1"))
@@ -0,0 +1,81 @@
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+from services import id_filter
+from services.id_filter import IdFilter
+
+
+ETL_PATH = Path(__file__).parents[2] / "etl"
+if ETL_PATH.exists():
+    sys.path.insert(0, str(ETL_PATH))
+# фильтры собирает ETL: проверяем API против его кода, если он рядом
+bloom = pytest.importorskip("etl.bloom")
+
+
+class SetbitRedis:
+    """Строка redis и SETBIT по документации: нулевой бит - старший бит
+    первого байта, строка дорастает нулями до нужного байта."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        pass
+
+    def setbit(self, key, offset, value):
+        data = self.data.setdefault(key, bytearray())
+        byte, bit = divmod(offset, 8)
+        if len(data) <= byte:
+            data.extend(bytes(byte + 1 - len(data)))
+        if value:
+            data[byte] |= 0x80 >> bit
+        else:
+            data[byte] &= ~(0x80 >> bit) & 0xFF
+
+    def set(self, key, value):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def get(self, key):
+        value = self.data.get(key)
+        return None if value is None else bytes(value)
+
+
+def test_etl_and_api_agree_on_bloom_positions():
+    assert bloom.KEY_PREFIX == id_filter.KEY_PREFIX
+    assert bloom.INDEXES == id_filter.INDEXES
+    for doc_id in ("f1", str(uuid.uuid4()), "фильм"):
+        assert list(bloom.positions(doc_id, 10007, 7)) == list(id_filter.positions(doc_id, 10007, 7))
+
+
+def test_api_reads_filter_written_by_etl():
+    redis = SetbitRedis()
+    publisher = bloom.BloomPublisher(size=8192, hashes=5)
+    present = [str(uuid.uuid4()) for _ in range(100)]
+    publisher.add(redis, "movies", present)
+    publisher.mark_complete(redis)
+
+    movies = IdFilter("movies")
+    movies.load(redis.get(movies.key + ":meta"), redis.get(movies.key))
+
+    assert movies.loaded
+    assert all(movies.might_contain(doc_id) for doc_id in present)
+    absent = [str(uuid.uuid4()) for _ in range(1000)]
+    # при 100 id в 8192 битах и 5 хэшах ложных "да" - доли процента
+    assert sum(movies.might_contain(doc_id) for doc_id in absent) < 20
+
+
+def test_filter_without_meta_is_not_used():
+    redis = SetbitRedis()
+    bloom.BloomPublisher(size=8192, hashes=5).add(redis, "movies", ["f1"])
+
+    movies = IdFilter("movies")
+    movies.load(redis.get(movies.key + ":meta"), redis.get(movies.key))
+
+    assert not movies.loaded
+    assert movies.might_contain("anything")
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+from elasticsearch import ConnectionError, NotFoundError
+
+from services.films import FilmService
+from services.mget_loader import MgetLoader
+from services.persons import PersonService
+
+
+class MissingIndex:
+    async def mget(self, **kwargs):
+        raise NotFoundError(404, "index_not_found_exception", {})
+
+
+@pytest.mark.parametrize("service_class", [FilmService, PersonService])
+def test_get_from_missing_index_is_not_found(service_class):
+    service = service_class(MissingIndex())
+
+    async def main():
+        return await service.get("f1"), await service.get_many(["f1", "f2"])
+
+    assert asyncio.run(main()) == (None, {})
+
+
+class Elastic:
+    def __init__(self, docs=None, error=None):
+        self.docs = docs or {}
+        self.error = error
+        self.requests = []
+
+    async def mget(self, body, index):
+        self.requests.append(body["docs"])
+        if self.error is not None:
+            raise self.error
+        result = []
+        for request in body["docs"]:
+            source = self.docs.get(request["_id"])
+            if source is None:
+                result.append({"_id": request["_id"], "found": False})
+                continue
+            if "_source" in request:
+                source = {k: v for k, v in source.items() if k in request["_source"]}
+            result.append({"_id": request["_id"], "found": True, "_source": source})
+        return {"docs": result}
+
+
+DOCS = {
+    "f1": {"uuid": "f1", "title": "One", "imdb_rating": 7.0},
+    "f2": {"uuid": "f2", "title": "Two", "imdb_rating": 8.0},
+}
+
+
+def load_all(elastic, requests, window=0.001, max_batch=100):
+    async def main():
+        loader = MgetLoader(elastic, "movies", window=window, max_batch=max_batch)
+        return await asyncio.gather(
+            *(loader.load(doc_id, fields) for doc_id, fields in requests),
+            return_exceptions=True
+        )
+    return asyncio.run(main())
+
+
+def test_concurrent_loads_share_one_mget():
+    elastic = Elastic(DOCS)
+
+    results = load_all(elastic, [("f1", None), ("f2", None), ("f3", None)])
+
+    assert results == [DOCS["f1"], DOCS["f2"], None]
+    assert elastic.requests == [[{"_id": "f1"}, {"_id": "f2"}, {"_id": "f3"}]]
+
+
+def test_same_id_and_fields_requested_once():
+    elastic = Elastic(DOCS)
+
+    results = load_all(elastic, [("f1", ["title"]), ("f1", ["title"])])
+
+    assert results == [{"title": "One"}, {"title": "One"}]
+    assert elastic.requests == [[{"_id": "f1", "_source": ["title"]}]]
+
+
+def test_each_doc_gets_its_own_source():
+    elastic = Elastic(DOCS)
+
+    results = load_all(elastic, [("f1", ["title"]), ("f1", None), ("f2", ["imdb_rating"])])
+
+    assert results == [{"title": "One"}, DOCS["f1"], {"imdb_rating": 8.0}]
+    assert elastic.requests == [[
+        {"_id": "f1", "_source": ["title"]},
+        {"_id": "f1"},
+        {"_id": "f2", "_source": ["imdb_rating"]},
+    ]]
+
+
+def test_mget_error_reaches_every_waiter():
+    error = ConnectionError("N/A", "elasticsearch is down", None)
+
+    results = load_all(Elastic(error=error), [("f1", None), ("f2", ["title"])])
+
+    assert results == [error, error]
+
+
+def test_full_batch_dispatched_without_waiting_for_window():
+    elastic = Elastic(DOCS)
+    started = time.monotonic()
+
+    # окно в 10 секунд: ответ раньше возможен только по max_batch
+    results = load_all(elastic, [("f1", None), ("f2", None)], window=10, max_batch=2)
+
+    assert time.monotonic() - started < 1
+    assert results == [DOCS["f1"], DOCS["f2"]]
+    assert elastic.requests == [[{"_id": "f1"}, {"_id": "f2"}]]
+
+
+def test_loads_beyond_max_batch_go_to_next_mget():
+    elastic = Elastic(DOCS)
+
+    results = load_all(elastic, [("f1", None), ("f2", None), ("f3", None)], max_batch=2)
+
+    assert results == [DOCS["f1"], DOCS["f2"], None]
+    assert elastic.requests == [[{"_id": "f1"}, {"_id": "f2"}], [{"_id": "f3"}]]
@@ -0,0 +1,265 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import orjson
+import pytest
+from elasticsearch import ConnectionError
+from pydantic import BaseModel
+
+from core import config, view_decorators
+from services.cache import CacheEntry
+
+
+def test_single_flight_coalesces():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(
+            view_decorators.single_flight("key", compute) for _ in range(5)
+        ))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert len(calls) == 1
+    assert view_decorators._inflight == {}
+
+
+def test_single_flight_leader_cancelled():
+    started = []
+
+    async def compute():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.create_task(view_decorators.single_flight("key", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(view_decorators.single_flight("key", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # ждущий не отменён: он пересчитывает сам
+        return await waiter
+
+    assert asyncio.run(main()) == "value"
+    assert len(started) == 2
+
+
+def test_single_flight_waiter_cancelled():
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.create_task(view_decorators.single_flight("key", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(view_decorators.single_flight("key", compute))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == "value"
+
+
+class MemoryStorage(view_decorators.BaseCacheStorage):
+    def __init__(self):
+        self.entries = {}
+        self.expires = {}
+        self.locks = {}
+
+    async def async_init(self):
+        pass
+
+    async def get_data_from_cache(self, cache_key):
+        return self.entries.get(cache_key)
+
+    async def get_many_from_cache(self, cache_keys):
+        return [self.entries.get(cache_key) for cache_key in cache_keys]
+
+    async def set_data_to_cache(self, cache_key, cache_data, expire=30, tags=()):
+        self.entries[cache_key] = cache_data
+        self.expires[cache_key] = expire
+
+    async def invalidate_tags(self, tags):
+        return []
+
+    async def acquire_lock(self, cache_key, expire_ms):
+        await asyncio.sleep(0)  # как сетевой вызов: отдаём управление
+        if cache_key in self.locks:
+            return None
+        self.locks[cache_key] = "ours"
+        return "ours"
+
+    async def release_lock(self, cache_key, lock_token):
+        if self.locks.get(cache_key) == lock_token:
+            del self.locks[cache_key]
+
+
+class Item(BaseModel):
+    uuid: str
+    version: int
+
+
+def make_view(storage, calls):
+    @view_decorators.url_cache(expire=60, stale=300, storage=storage)
+    async def item_details(item_id: str) -> Item:
+        calls.append(item_id)
+        return Item(uuid=item_id, version=len(calls))
+    return item_details
+
+
+def put_entry(storage, view, version, soft_expire_in, expire_in):
+    now = time.time()
+    storage.entries[view.cache_key(item_id="1")] = CacheEntry(
+        payload=orjson.dumps({"uuid": "1", "version": version}),
+        soft_expire_at=now + soft_expire_in,
+        expire_at=now + expire_in,
+    )
+
+
+def test_stale_entry_served_and_refreshed_in_background():
+    storage, calls = MemoryStorage(), []
+    view = make_view(storage, calls)
+    put_entry(storage, view, version=0, soft_expire_in=-1, expire_in=300)
+
+    async def main():
+        response = await view(item_id="1")
+        await asyncio.gather(*view_decorators._background_tasks)
+        return response
+
+    response = asyncio.run(main())
+
+    assert orjson.loads(response.body)["version"] == 0  # отдали устаревшую сразу
+    assert calls == ["1"]
+    assert storage.entries[view.cache_key(item_id="1")].is_fresh()
+
+
+def test_miss_during_background_refresh(monkeypatch):
+    # фоновое обновление не получает лок (он у другого воркера) и ничего
+    # не возвращает; промах в это же время должен посчитать ответ сам
+    monkeypatch.setattr(config, "CACHE_LOCK_EXPIRE_MS", 100)
+    storage, calls = MemoryStorage(), []
+    view = make_view(storage, calls)
+    put_entry(storage, view, version=0, soft_expire_in=-1, expire_in=300)
+    cache_key = view.cache_key(item_id="1")
+    storage.locks[cache_key] = "other worker"
+
+    async def main():
+        await view(item_id="1")  # запускает фоновое обновление
+        await asyncio.sleep(0)
+        del storage.entries[cache_key]  # запись сняла инвалидация ETL
+        response = await view(item_id="1")
+        await asyncio.gather(*view_decorators._background_tasks)
+        return response
+
+    response = asyncio.run(main())
+
+    assert response.status_code == HTTPStatus.OK
+    assert orjson.loads(response.body)["uuid"] == "1"
+    assert calls == ["1"]
+
+
+def test_waiter_does_not_take_expired_entry(monkeypatch):
+    # держатель лока не успел; просроченная запись, хранимая про запас,
+    # не должна уйти ждущему как обычный ответ
+    monkeypatch.setattr(config, "CACHE_LOCK_EXPIRE_MS", 50)
+    monkeypatch.setattr(config, "CACHE_LOCK_POLL_INTERVAL", 0.01)
+    storage, calls = MemoryStorage(), []
+    view = make_view(storage, calls)
+    put_entry(storage, view, version=0, soft_expire_in=-400, expire_in=-100)
+    storage.locks[view.cache_key(item_id="1")] = "other worker"
+
+    response = asyncio.run(view(item_id="1"))
+
+    assert orjson.loads(response.body)["version"] == 1
+    assert view_decorators.STALE_HEADER not in response.headers
+    assert calls == ["1"]
+
+
+def test_fallback_retention_is_opt_in():
+    storage = MemoryStorage()
+
+    @view_decorators.url_cache(expire=60, stale=300, storage=storage)
+    async def item_search(query: str) -> Item:
+        return Item(uuid=query, version=1)
+
+    @view_decorators.url_cache(expire=60, fallback=3600, storage=storage)
+    async def item_details(item_id: str) -> Item:
+        return Item(uuid=item_id, version=1)
+
+    async def main():
+        await item_search(query="star")
+        await item_details(item_id="1")
+
+    asyncio.run(main())
+
+    assert storage.expires[item_search.cache_key(query="star")] == 360
+    assert storage.expires[item_details.cache_key(item_id="1")] == 3660
+
+
+def test_batch_outage_reports_unavailable_not_not_found():
+    storage, calls = MemoryStorage(), []
+    view = make_view(storage, calls)
+    put_entry(storage, view, version=0, soft_expire_in=-400, expire_in=-100)
+
+    async def fetch(missed):
+        raise ConnectionError("N/A", "elasticsearch is down", None)
+
+    batch = asyncio.run(view_decorators.cached_batch(view, "item_id", ["1", "2"], fetch))
+    response = view_decorators.batch_response(["1", "2"], batch)
+
+    assert orjson.loads(response.body) == {
+        "items": [{"uuid": "1", "version": 0}],
+        "not_found": [],
+        "unavailable": ["2"],
+    }
+    assert 399 <= int(response.headers[view_decorators.STALE_HEADER]) <= 401
+
+
+def test_batch_reports_missing_as_not_found():
+    storage, calls = MemoryStorage(), []
+    view = make_view(storage, calls)
+
+    async def fetch(missed):
+        return {uuid: Item(uuid=uuid, version=1) for uuid in missed if uuid == "1"}
+
+    batch = asyncio.run(view_decorators.cached_batch(view, "item_id", ["1", "2"], fetch))
+    response = view_decorators.batch_response(["1", "2"], batch)
+
+    assert orjson.loads(response.body) == {
+        "items": [{"uuid": "1", "version": 1}],
+        "not_found": ["2"],
+    }
+    assert view_decorators.STALE_HEADER not in response.headers
+
+
+def test_batch_response_validators():
+    storage, calls = MemoryStorage(), []
+    view = make_view(storage, calls)
+    put_entry(storage, view, version=0, soft_expire_in=40, expire_in=340)
+
+    async def fetch(missed):
+        return {uuid: Item(uuid=uuid, version=1) for uuid in missed}
+
+    batch = asyncio.run(view_decorators.cached_batch(view, "item_id", ["1", "2"], fetch))
+    response = view_decorators.batch_response(["1", "2"], batch)
+    etag = response.headers["ETag"]
+
+    # свежесть ответа - как у самой "старой" записи в нём
+    assert 39 <= int(response.headers["Cache-Control"].removeprefix("max-age=")) <= 40
+
+    class Conditional:
+        headers = {"if-none-match": etag}
+
+    response = view_decorators.batch_response(["1", "2"], batch, Conditional())
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["ETag"] == etag
@@ -85,6 +85,12 @@ def logout_refresh() -> tuple[str, HTTPStatus]:
     return ReqMessage.LOGOUT_REFRESH, HTTPStatus.OK
 
 
+def token_status(jti: str) -> tuple[dict, HTTPStatus]:
+    """Отозван ли токен: для сервисов, которые сами проверяют его подпись"""
+    return ({'revoked': RevokedTokenModel.is_jti_blocklisted(jti)},
+            HTTPStatus.OK)
+
+
 def login_oauth(provider: str) -> Response | tuple[str, HTTPStatus]:
     """Функция для входа через OAuth Google,
     перенаправляет в login_authorize_google для авторизации через Google"""
@@ -76,6 +76,11 @@ limiter = Limiter(app, key_func=get_remote_address,
                   default_limits=['20/minute'])
 limiter.init_app(app)
 
+# сервисы спрашивают статус токена со своего адреса на каждого пользователя
+from app.api.v1.login import token_status  # noqa: E402
+
+limiter.exempt(token_status)
+
 jwt = JWTManager(app)
 
 
@@ -1,3 +1,5 @@
+import base64
+import json
 import uuid
 from http import HTTPStatus
 
@@ -126,3 +128,28 @@ async def test_guest_has_no_rights_to_change_password(make_get_request):
 
     assert response.status == HTTPStatus.UNAUTHORIZED
     assert response.body == {'msg': 'Missing Authorization Header'}
+
+
+async def test_token_status(make_get_request):
+    """Статус отзыва токена по jti (его спрашивает API кинотеатра)"""
+    access_token, _ = await login_user(make_get_request, 0)
+    payload = access_token.split('.')[1]
+    jti = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))['jti']
+    headers = {'X-Request-Id': str(uuid.uuid4())}
+
+    response = await make_get_request(
+        f'/token_status/{jti}', headers=headers, method_type='get'
+    )
+
+    assert response.status == HTTPStatus.OK
+    assert response.body == {'revoked': False}
+
+    await make_get_request(
+        '/logout', headers={**headers, 'Authorization': 'Bearer ' + access_token}
+    )
+    response = await make_get_request(
+        f'/token_status/{jti}', headers=headers, method_type='get'
+    )
+
+    assert response.status == HTTPStatus.OK
+    assert response.body == {'revoked': True}
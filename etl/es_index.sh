@@ -58,6 +58,10 @@
           }
         }
       },
+      "title_suggest": {
+        "type": "completion",
+        "analyzer": "simple"
+      },
       "description": {
         "type": "text",
         "analyzer": "ru_en"
@@ -170,14 +174,37 @@ curl -XPUT http://elasticsearch:9200/persons -H 'Content-Type: application/json'
           "type": "text",
           "analyzer": "ru_en"
       },
+      "full_name_suggest": {
+        "type": "completion",
+        "analyzer": "simple"
+      },
       "birth_date": {
           "type": "date"
+      },
+      "films": {
+        "type": "nested",
+        "dynamic": "strict",
+        "properties": {
+          "uuid": {
+            "type": "keyword"
+          },
+          "title": {
+            "type": "text",
+            "analyzer": "ru_en"
+          },
+          "imdb_rating": {
+            "type": "float"
+          },
+          "roles": {
+            "type": "keyword"
+          }
+        }
       }
     }
   }
 }'
 
-curl -XPUT http://elasticsearch:9200/persons -H 'Content-Type: application/json' -d'
+curl -XPUT http://elasticsearch:9200/genres -H 'Content-Type: application/json' -d'
 {
   "settings": {
     "refresh_interval": "5s",
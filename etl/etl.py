@@ -72,6 +72,9 @@ def main():
     transformer = Transformer()
     loader = Loader()
     initiate_updates_check(state, dt=date.min)
+    # первый цикл идёт с date.min, т.е. по всем документам: после него
+    # фильтры id в redis полные и API может отсекать по ним несуществующие
+    id_filters_complete = False
     while state.get_state(State.KEY_QUIT) == State.KEY_QUIT_VALUE_RUN:
         parametrized_pipelines = [
             {
@@ -124,6 +127,8 @@ def main():
                     )
                     loader.load_batch(transformed_batch, et['N'])
 
+        if not id_filters_complete:
+            id_filters_complete = loader.complete_id_filters()
         sleep(updates_check_interval)
         # если хочется "повысить гарантию", тут можно сделать отступ назад, но
         # очевидно не более чем на updates_check_interval + минимальная дельта
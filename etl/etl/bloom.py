@@ -0,0 +1,82 @@
+"""Bloom-фильтр id документов для API (битовая строка в redis)."""
+import hashlib
+import json
+from typing import Iterable, Iterator
+
+from redis import Redis
+
+# ключи: <prefix>:<index> - биты, <prefix>:<index>:meta - параметры фильтра.
+# Пока meta нет, фильтр считается неполным и API им не пользуется
+KEY_PREFIX = 'bloom'
+INDEXES = ('movies', 'persons', 'genres')
+
+
+def positions(doc_id: str, size: int, hashes: int) -> Iterator[int]:
+    """Номера битов для id (двойное хэширование, как в API).
+
+    Args:
+        doc_id (str): id документа
+        size (int): размер фильтра в битах
+        hashes (int): число хэш-функций
+    Yields:
+        int: номер бита
+    """
+    digest = hashlib.blake2b(doc_id.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:], 'big') | 1
+    for i in range(hashes):
+        yield (h1 + i * h2) % size
+
+
+class BloomPublisher(object):
+    """Наполнение фильтров в redis по мере загрузки документов в ES."""
+
+    def __init__(self, size: int, hashes: int):
+        """Инициализация.
+
+        Args:
+            size (int): размер фильтра в битах
+            hashes (int): число хэш-функций
+        """
+        self.size = size
+        self.hashes = hashes
+        self.meta = json.dumps({'size': size, 'hashes': hashes})
+
+    def prepare(self, redis: Redis) -> None:
+        """Сброс фильтров, собранных с другими параметрами.
+
+        Фильтр с теми же параметрами остаётся рабочим: биты только
+        добавляются, а полный проход ETL лишь дополнит их.
+
+        Args:
+            redis (Redis): соединение с redis
+        """
+        for index in INDEXES:
+            key = '{0}:{1}'.format(KEY_PREFIX, index)
+            meta = redis.get(key + ':meta')
+            if meta is None or meta.decode() != self.meta:
+                redis.delete(key, key + ':meta')
+
+    def add(self, redis: Redis, index: str, ids: Iterable[str]) -> None:
+        """Установка битов для загруженных id.
+
+        Args:
+            redis (Redis): соединение с redis
+            index (str): индекс ES
+            ids (Iterable[str]): id загруженных документов
+        """
+        key = '{0}:{1}'.format(KEY_PREFIX, index)
+        pipe = redis.pipeline(transaction=False)
+        for doc_id in ids:
+            for bit in positions(doc_id, self.size, self.hashes):
+                pipe.setbit(key, bit, 1)
+        pipe.execute()
+
+    def mark_complete(self, redis: Redis) -> None:
+        """Публикация параметров после полного прохода по всем индексам.
+
+        Args:
+            redis (Redis): соединение с redis
+        """
+        for index in INDEXES:
+            redis.set('{0}:{1}:meta'.format(KEY_PREFIX, index), self.meta)
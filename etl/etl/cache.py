@@ -0,0 +1,64 @@
+"""Инвалидация кэша API (url_cache) по загруженным документам."""
+import time
+from typing import Iterable, List
+
+from redis import Redis
+
+# формат тегов и сценарий удаления совпадают с API:
+# api/core/cache_tags.py, api/services/cache.py (RedisCacheStorage)
+TAG_PREFIX = 'tags:'
+LIST_TAG = 'list'
+INDEX_ENTITIES = {
+    'movies': 'film',
+    'persons': 'person',
+    'genres': 'genre',
+}
+INVALIDATE_SCRIPT = """
+    local evicted = {}
+    for _, tag in ipairs(KEYS) do
+        for _, key in ipairs(redis.call("zrangebyscore", tag, ARGV[1], "+inf")) do
+            redis.call("del", key)
+            evicted[#evicted + 1] = key
+        end
+        redis.call("del", tag)
+    end
+    return evicted
+"""
+
+
+def cache_tags(index: str, ids: Iterable[str]) -> List[str]:
+    """Теги записей кэша API, которые зависят от документов индекса.
+
+    Args:
+        index (str): индекс ES
+        ids (Iterable[str]): id изменённых документов
+    Returns:
+        List[str]: ключи тегов в redis
+    """
+    entity = INDEX_ENTITIES.get(index)
+    if entity is None:
+        return []
+    return [
+        '{0}{1}:{2}'.format(TAG_PREFIX, entity, uuid)
+        for uuid in list(ids) + [LIST_TAG]
+    ]
+
+
+def evict(redis: Redis, index: str, ids: Iterable[str]) -> List[str]:
+    """Удаление записей кэша API по изменённым документам.
+
+    Удаляем здесь, один раз на изменение: воркерам API остаётся
+    забыть те же ключи в своей памяти (L1).
+
+    Args:
+        redis (Redis): соединение с redis
+        index (str): индекс ES
+        ids (Iterable[str]): id изменённых документов
+    Returns:
+        List[str]: удалённые ключи
+    """
+    tags = cache_tags(index, ids)
+    if not tags:
+        return []
+    evicted = redis.eval(INVALIDATE_SCRIPT, len(tags), *tags, int(time.time()))
+    return list(dict.fromkeys(key.decode() for key in evicted))
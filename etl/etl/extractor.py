@@ -81,12 +81,47 @@ class Extractor(Logger):
         ;
     """
 
-    MODIFIED_PERSONS_SQL = """    
-            SELECT id, full_name, birth_date
+    # Персона хранит свои фильмы (uuid, название, рейтинг, роль), поэтому
+    # переиндексируется и при изменении любого из её фильмов
+    MODIFIED_PERSONS_SQL = """
+        WITH PERSONS_CHANGED_DIRECT AS (
+            SELECT ID, MODIFIED
             FROM CONTENT.person
             WHERE modified >= TO_DATE('{0}', 'YYYY-MM-DD HH24:MI:SS')
-            ORDER BY modified
-            LIMIT {1} OFFSET {2} 
+        ), PERSONS_CHANGED_VIA_MOVIES AS (
+            SELECT PFW.person_id AS ID, FW.MODIFIED
+            FROM CONTENT.film_work FW
+            INNER JOIN CONTENT.person_film_work PFW
+                ON PFW.film_work_id = FW.id
+            WHERE FW.modified >= TO_DATE('{0}', 'YYYY-MM-DD HH24:MI:SS')
+        ), PERSONS_CHANGED_UNIQUE_IDS AS (
+            SELECT ID FROM (
+                SELECT ID, MAX(MODIFIED) AS MODIFIED FROM (
+                    (SELECT ID, MODIFIED FROM PERSONS_CHANGED_DIRECT)
+                    UNION ALL
+                    (SELECT ID, MODIFIED FROM PERSONS_CHANGED_VIA_MOVIES)
+                ) AS IDS GROUP BY ID
+            ) AS PERSONS ORDER BY MODIFIED, ID LIMIT {1} OFFSET {2}
+        )  SELECT
+                p.id,
+                p.full_name,
+                p.birth_date,
+                COALESCE(
+                    JSON_AGG(
+                        JSON_BUILD_OBJECT(
+                            'uuid', fw.id,
+                            'title', fw.title,
+                            'imdb_rating', fw.rating,
+                            'role', pfw.role
+                        ) ORDER BY fw.rating DESC NULLS LAST, fw.title
+                    ) FILTER (WHERE fw.id IS NOT NULL),
+                    '[]'
+                ) as "films"
+            FROM content.person p
+            INNER JOIN PERSONS_CHANGED_UNIQUE_IDS up ON p.ID = up.ID
+            LEFT JOIN content.person_film_work pfw ON pfw.person_id = p.id
+            LEFT JOIN content.film_work fw ON fw.id = pfw.film_work_id
+            GROUP BY p.id
         ;
     """
 
@@ -1,12 +1,16 @@
 """Загрузка трансформированных данных в ES."""
+import json
 import logging
 import os
 
 import urllib3
 from elasticsearch import ConnectionError, ConnectionTimeout, Elasticsearch
 from elasticsearch.helpers import bulk
+from redis import Redis, RedisError
 
 from .backoff import backoff
+from .bloom import BloomPublisher
+from .cache import evict
 from .logger import Logger
 
 urllib3.disable_warnings()
@@ -31,6 +35,19 @@ class Loader(Logger):
         self.key = key
         self.es_address = eval(os.environ.get('ELASTICSEARCH_ADDRESS'))
         self.es = None
+        self.redis = None
+        self.invalidation_channel = os.environ.get(
+            'CACHE_INVALIDATION_CHANNEL',
+            'cache:invalidate',
+        )
+        self.bloom = BloomPublisher(
+            size=int(os.environ.get('BLOOM_SIZE_BITS', 2 ** 23)),
+            hashes=int(os.environ.get('BLOOM_HASHES', 7)),
+        )
+        self.bloom_prepared = False
+        # id, не попавшие в фильтр из-за ошибки redis: без них фильтр
+        # давал бы API ложные 404, поэтому повторяем при следующей загрузке
+        self.bloom_pending = {}
 
     @backoff(
         Logger('Loader/BO'),
@@ -61,7 +78,9 @@ class Loader(Logger):
         """
         while True:
             try:
-                response = bulk(self.es, batch)
+                # wait_for: к моменту инвалидации кэша API документы
+                # уже видны в поиске, иначе кэш заполнится старыми данными
+                response = bulk(self.es, batch, refresh='wait_for')
                 if response[0] != len(batch):
                     self.log('{0}: update {1} rec, {2} errors, retry'.format(
                         name,
@@ -73,7 +92,75 @@ class Loader(Logger):
                 break
             except (ConnectionError, ConnectionTimeout, AttributeError):
                 self.reconnect()
+        self.publish_changes(batch)
         if self.es is not None:
             self.es.close()
             self.es = None
             self.log('elasticsearch connection closed')
+
+    def publish_changes(self, batch: list) -> None:
+        """Инвалидация кэша API по загруженным документам.
+
+        Записи в redis удаляются здесь, затем на каждый индекс публикуется
+        {"index": "movies", "ids": [...], "keys": [...]}: воркеры API
+        обновляют по id своё состояние в памяти и забывают keys в L1.
+        Ошибка redis не прерывает загрузку: кэш API в худшем случае
+        доживёт до своего TTL.
+
+        Args:
+            batch (list): загруженные документы
+        """
+        changes = {}
+        for doc in batch:
+            changes.setdefault(doc['_index'], []).append(doc['_id'])
+        for index, ids in changes.items():
+            self.bloom_pending.setdefault(index, []).extend(ids)
+        try:
+            redis = self.connect_redis()
+            for index in list(self.bloom_pending):
+                self.bloom.add(redis, index, self.bloom_pending[index])
+                del self.bloom_pending[index]
+            for index, ids in changes.items():
+                keys = evict(redis, index, ids)
+                redis.publish(
+                    self.invalidation_channel,
+                    json.dumps({'index': index, 'ids': ids, 'keys': keys}),
+                )
+        except RedisError as ex:
+            self.redis = None
+            self.log('cache invalidation publish failed: {0}'.format(ex))
+
+    def connect_redis(self) -> Redis:
+        """Соединение с redis (при первом подключении сверяет фильтры).
+
+        Returns:
+            Redis: соединение с redis
+        """
+        if self.redis is None:
+            self.redis = Redis(
+                host=os.environ['REDIS_HOST'],
+                port=os.environ['REDIS_PORT'],
+                db=os.environ['REDIS_DB'],
+                password=os.environ['REDIS_PASSWORD'],
+            )
+        if not self.bloom_prepared:
+            self.bloom.prepare(self.redis)
+            self.bloom_prepared = True
+        return self.redis
+
+    def complete_id_filters(self) -> bool:
+        """Включение фильтров id в API после полного прохода ETL.
+
+        Returns:
+            bool: фильтры опубликованы
+        """
+        if self.bloom_pending:
+            return False
+        try:
+            self.bloom.mark_complete(self.connect_redis())
+        except RedisError as ex:
+            self.redis = None
+            self.log('id filters publish failed: {0}'.format(ex))
+            return False
+        self.log('id filters published')
+        return True
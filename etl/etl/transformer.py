@@ -1,11 +1,40 @@
 """Трансформация данных из postgres под elasticsearch."""
 from .logger import Logger
 
+# со скольких первых слов названия/имени может начинаться подсказка
+# (completion suggester ищет только по префиксу входа, поэтому входы -
+# хвосты строки по словам)
+SUGGEST_MAX_INPUTS = 8
+
+
+def suggest(text: str, weight: float = 0) -> dict:
+    """Вход completion suggester: строка целиком и её хвосты по словам.
+
+    Args:
+        text (str): название или имя
+        weight (float): вес подсказки (чем больше, тем выше в выдаче)
+
+    Returns:
+        dict: значение completion-поля
+    """
+    words = (text or '').split()
+    return {
+        'input': [
+            ' '.join(words[start:])
+            for start in range(min(len(words), SUGGEST_MAX_INPUTS))
+        ],
+        'weight': max(int(weight), 0),
+    }
+
+
 TRANSFORMATIONS_MOVIES = [
     lambda rec: {'_id': rec['fw_id'], '_index': 'movies'},
     lambda rec: {'uuid': rec['fw_id']},
     lambda rec: {'imdb_rating': rec['rating']},
     lambda rec: {'title': rec['title']},
+    lambda rec: {
+        'title_suggest': suggest(rec['title'], (rec['rating'] or 0) * 10),
+    },
     lambda rec: {'description': rec['description']},
     lambda re: {
         'actors': [
@@ -40,11 +69,40 @@ TRANSFORMATIONS_MOVIES = [
     },
 ]
 
+
+def person_films(films: list) -> list:
+    """Свернуть строки (фильм, роль) персоны в список фильмов с ролями.
+
+    Args:
+        films (list): строки из БД, по одной на пару фильм-роль
+
+    Returns:
+        list: фильмы в исходном порядке, роли отсортированы
+    """
+    by_uuid = {}
+    for film in films:
+        entry = by_uuid.setdefault(film['uuid'], {
+            'uuid': film['uuid'],
+            'title': film['title'],
+            'imdb_rating': film['imdb_rating'],
+            'roles': [],
+        })
+        if film['role'] and film['role'] not in entry['roles']:
+            entry['roles'].append(film['role'])
+    for entry in by_uuid.values():
+        entry['roles'].sort()
+    return list(by_uuid.values())
+
+
 TRANSFORMATIONS_PERSONS = [
     lambda rec: {'_id': rec['id'], '_index': 'persons'},
     lambda rec: {'uuid': rec['id']},
     lambda rec: {'full_name': rec['full_name']},
+    lambda rec: {
+        'full_name_suggest': suggest(rec['full_name'], len(rec['films'])),
+    },
     lambda rec: {'birth_date': rec['birth_date']},
+    lambda rec: {'films': person_films(rec['films'])},
 ]
 
 TRANSFORMATIONS_GENRES = [
@@ -1,5 +1,7 @@
 import aiohttp
 import asyncio
+import gzip
+import json
 import pytest
 from tests.functional.settings import (
     API_HOST,
@@ -88,7 +90,11 @@ def redis_get_from_cache(redis):
     async def inner(key: str) -> None:
         redis_cache_data = await redis.get(key)
         if redis_cache_data:
-            return redis_cache_data.decode()
+            # первая строка - метаданные записи (см. api/services/cache.py)
+            header, _, payload = redis_cache_data.partition(b"\n")
+            if json.loads(header).get("enc") == "gzip":
+                payload = gzip.decompress(payload)
+            return payload.decode()
         return None
     return inner
 
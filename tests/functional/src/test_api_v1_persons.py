@@ -15,7 +15,7 @@ async def test_api_v1_person(
         redis_flushall,
         redis_get_from_cache
 ):
-    key = get_cache_key("person_details", kwargs={"person_id": person["uuid"]})
+    key = get_cache_key("person_details", kwargs={"person_id": person["uuid"], "fields": None})
 
     await redis_flushall()
     empty_cache = await redis_get_from_cache(key)
@@ -38,7 +38,7 @@ async def test_api_v1_person_ne(
     redis_get_from_cache
 ):
     fake_id = "-ne-"
-    key = get_cache_key("person_details", kwargs={"person_id": fake_id})
+    key = get_cache_key("person_details", kwargs={"person_id": fake_id, "fields": None})
 
     await redis_flushall()
     empty_cache = await redis_get_from_cache(key)
@@ -47,7 +47,7 @@ async def test_api_v1_person_ne(
 
     assert response.status == HTTPStatus.NOT_FOUND
     assert empty_cache is None
-    assert cached is None
+    assert eval(cached) == {"detail": "person not found"}  # 404 тоже кэшируется
 
 
 async def test_api_v1_person_films(api_v1_path, make_get_request, redis_flushall):
@@ -81,3 +81,19 @@ async def test_search_films(api_v1_path, make_get_request, redis_flushall):
     ]
 
     assert all(query_in_searched_films)
+
+
+async def test_api_v1_person_films_paging(api_v1_path, make_get_request, redis_flushall):
+    await redis_flushall()
+    person = EXISTING_PERSONS[0]
+    response = await make_get_request(
+        path=api_v1_path,
+        method="persons/" + person["uuid"] + "/film/?details=true&page[size]=1",
+    )
+
+    assert response.status == HTTPStatus.OK
+    assert len(response.body) == 1
+    assert response.body[0]["uuid"] in [film["uuid"] for film in person["film_ids"]]
+    # полные сведения о фильме - только по запросу
+    assert {"genres", "actors", "writers", "directors"} <= response.body[0].keys()
+    assert response.headers.get("X-Total-Count") == str(len(person["film_ids"]))
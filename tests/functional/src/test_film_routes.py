@@ -50,7 +50,7 @@ async def test_get_one_film(
     redis_flushall,
     redis_get_from_cache
 ):
-    kwargs = {'film_id': film['uuid']}
+    kwargs = {'film_id': film['uuid'], 'fields': None}
     key = get_cache_key("film_details", kwargs=kwargs)
 
     await redis_flushall()
@@ -66,6 +66,30 @@ async def test_get_one_film(
     assert eval(cached) == film
 
 
+@pytest.mark.parametrize("film", [ONE_FILM])
+async def test_get_films_batch(
+    film,
+    api_v1_path,
+    make_get_request,
+    redis_flushall,
+    redis_get_from_cache
+):
+    fake_id = '-ne-'
+    key = get_cache_key("film_details", kwargs={'film_id': film['uuid'], 'fields': None})
+
+    await redis_flushall()
+    response = await make_get_request(
+        path=api_v1_path,
+        method="films/batch",
+        params={'ids': f"{fake_id},{film['uuid']}"}
+    )
+    cached = await redis_get_from_cache(key)
+
+    assert response.status == HTTPStatus.OK
+    assert response.body == {'items': [film], 'not_found': [fake_id]}
+    assert eval(cached) == film
+
+
 async def test_get_not_exist_film(
     api_v1_path,
     make_get_request,
@@ -73,7 +97,7 @@ async def test_get_not_exist_film(
     redis_get_from_cache
 ):
     fake_id = '-ne-'
-    kwargs = {'film_id': fake_id}
+    kwargs = {'film_id': fake_id, 'fields': None}
     key = get_cache_key("film_details", kwargs=kwargs)
 
     await redis_flushall()
@@ -84,7 +108,7 @@ async def test_get_not_exist_film(
     cached = await redis_get_from_cache(key)
 
     assert response.status == HTTPStatus.NOT_FOUND
-    assert cached is None
+    assert eval(cached) == {"detail": "film not found"}  # 404 тоже кэшируется
     assert empty_cache is None
 
 
@@ -133,3 +157,89 @@ async def test_search_films(api_v1_path, make_get_request, redis_flushall):
     query_in_searched_films = [query in film['title'].lower() for film in response.body]
 
     assert any(query_in_searched_films)
+
+
+async def test_get_films_by_cursor(api_v1_path, make_get_request, redis_flushall):
+    await redis_flushall()
+    first_page = await make_get_request(
+        path=api_v1_path, method="films/", params={"page[size]": "10"}
+    )
+    cursor = first_page.headers.get("X-Next-Cursor")
+
+    assert first_page.status == HTTPStatus.OK
+    assert cursor
+
+    second_page = await make_get_request(
+        path=api_v1_path,
+        method="films/",
+        params={"page[size]": "10", "page[cursor]": cursor}
+    )
+    by_number = await make_get_request(
+        path=api_v1_path,
+        method="films/",
+        params={"page[size]": "10", "page[number]": "2"}
+    )
+
+    assert second_page.status == HTTPStatus.OK
+    assert len(second_page.body) == 10
+    assert second_page.body == by_number.body
+
+
+async def test_get_films_by_invalid_cursor(api_v1_path, make_get_request):
+    response = await make_get_request(
+        path=api_v1_path, method="films/", params={"page[cursor]": "not-a-cursor"}
+    )
+    assert response.status == HTTPStatus.BAD_REQUEST
+
+
+async def test_suggest_films(api_v1_path, make_get_request, redis_flushall):
+    await redis_flushall()
+    response = await make_get_request(
+        path=api_v1_path, method="films/suggest", params={'prefix': 'sta', 'size': 5}
+    )
+
+    assert response.status == HTTPStatus.OK
+    assert 0 < len(response.body) <= 5
+    assert all(
+        any(word.lower().startswith('sta') for word in film['title'].split())
+        for film in response.body
+    )
+
+
+async def test_get_films_by_invalid_sort(api_v1_path, make_get_request):
+    response = await make_get_request(
+        path=api_v1_path, method="films/", params={"sort": "-description"}
+    )
+    assert response.status == HTTPStatus.BAD_REQUEST
+
+
+async def test_get_films_page_metadata(api_v1_path, make_get_request, redis_flushall):
+    await redis_flushall()
+    for _ in ["not cached", "cached"]:
+        response = await make_get_request(
+            path=api_v1_path, method="films/", params={"page[size]": 10}
+        )
+        assert response.status == HTTPStatus.OK
+        assert response.headers.get("X-Has-More") == "true"
+        assert int(response.headers.get("X-Total-Count")) > 10
+        assert response.headers.get("X-Total-Relation") in ("eq", "gte")
+
+
+@pytest.mark.parametrize("film", [ONE_FILM])
+async def test_get_one_film_fields(film, api_v1_path, make_get_request, redis_flushall):
+    await redis_flushall()
+    for _ in ["not cached", "cached"]:
+        response = await make_get_request(
+            path=api_v1_path,
+            method="films/" + film["uuid"],
+            params={"fields": "title,imdb_rating"}
+        )
+        assert response.status == HTTPStatus.OK
+        assert response.body == {k: film[k] for k in ("uuid", "title", "imdb_rating")}
+
+
+async def test_get_films_by_invalid_fields(api_v1_path, make_get_request):
+    response = await make_get_request(
+        path=api_v1_path, method="films/", params={"fields": "description"}
+    )
+    assert response.status == HTTPStatus.BAD_REQUEST
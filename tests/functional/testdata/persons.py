@@ -7,75 +7,12 @@ EXISTING_PERSONS = [
                 "uuid": "66d7de47-16d7-40e9-9d08-6e1773bc0bc3",
                 "title": "Make Me a Star",
                 "imdb_rating": 6.5,
-                "description": "Menton Gill is longing to become a cowboy actor and leaves his hometown to try his luck in Hollywood, but there his acting ability is regarded as non-existent. Actress Flips gives him a chance in a bit part, but he fails in that; however, the way he fails makes her think that he could be a good comedian. She persuades the studio to put him in a western parody, not telling him what they're really planing, because they know that he does not like comedies. Rather than ending tragic-comically, the movie becomes a brilliant coda to art and its servants, the artists, in this case the magniloquent Joan Blondell and Stuart Erwin.",
-                "genres": [
-                    {
-                        "uuid": "5373d043-3f41-4ea8-9947-4b746c601bbd",
-                        "name": "Comedy"
-                    },
-                    {
-                        "uuid": "237fd1e4-c98e-454e-aa13-8a13fb7547b5",
-                        "name": "Romance"
-                    },
-                    {
-                        "uuid": "1cacff68-643e-4ddd-8f57-84b62538081a",
-                        "name": "Drama"
-                    }
-                ],
-                "actors": [
-                    {
-                        "uuid": "84ce71ff-c1b0-4cd6-8ccb-babead0fe4d7",
-                        "full_name": "Zasu Pitts"
-                    },
-                    {
-                        "uuid": "13eb63d5-3ed2-4f7c-bdd2-854970c03a86",
-                        "full_name": "Ben Turpin"
-                    },
-                    {
-                        "uuid": "959ca660-a740-4f19-88e3-18cc72eab3ec",
-                        "full_name": "Joan Blondell"
-                    },
-                    {
-                        "uuid": "3a5184b5-156e-434d-b367-59e8f66ea4e2",
-                        "full_name": "Stuart Erwin"
-                    }
-                ],
-                "writers": [
-                    {
-                        "uuid": "eb64680b-e0bf-4ceb-b4f1-48b3017e9dfb",
-                        "full_name": "Arthur Kober"
-                    },
-                    {
-                        "uuid": "ee2b94ef-b2a6-47a7-bfc4-3cf601b76393",
-                        "full_name": "Walter DeLeon"
-                    },
-                    {
-                        "uuid": "06fed4f1-d5e4-4b31-92d9-9e8072b02af3",
-                        "full_name": "George S. Kaufman"
-                    },
-                    {
-                        "uuid": "0ea601bd-321d-480f-8b0b-abe94d6f7638",
-                        "full_name": "Harry Leon Wilson"
-                    },
-                    {
-                        "uuid": "caaede62-4729-4e3e-bad9-839189adae4e",
-                        "full_name": "Marc Connelly"
-                    },
-                    {
-                        "uuid": "04f4f579-e4b0-4d77-a444-58ac999a0f3a",
-                        "full_name": "Sam Mintz"
-                    }
-                ],
-                "directors": [
-                    {
-                        "uuid": "6b005807-14e1-4b4b-9d04-54934e4a6a11",
-                        "full_name": "William Beaudine"
-                    }
+                "roles": [
+                    "actor"
                 ]
             }
         ]
     },
-
     {
         "uuid": "90978fa1-5975-45fc-b2c8-36f15b273c17",
         "full_name": "Lauren Bowles",
@@ -84,42 +21,8 @@ EXISTING_PERSONS = [
                 "uuid": "8f66a240-1072-4529-88ba-bde17d7d4061",
                 "title": "Broken Star",
                 "imdb_rating": 4.2,
-                "description": "Abandoned by her friends and family and with her career in jeopardy, starlet Markey Marlowe is sequestered in a duplex with a reclusive landlord who just may be more dangerous than she is.",
-                "genres": [
-                    {
-                        "uuid": "526769d7-df18-4661-9aa6-49ed24e9dfd8",
-                        "name": "Thriller"
-                    }
-                ],
-                "actors": [
-                    {
-                        "uuid": "99a47cf1-b20f-4f77-965f-25a25c707ca9",
-                        "full_name": "Analeigh Tipton"
-                    },
-                    {
-                        "uuid": "6ba95ea0-c575-47dd-ae6f-04e07af943c6",
-                        "full_name": "Monique Coleman"
-                    },
-                    {
-                        "uuid": "a10995ee-9428-4fd3-b442-ea2ddb63f0b1",
-                        "full_name": "Tyler Labine"
-                    },
-                    {
-                        "uuid": "90978fa1-5975-45fc-b2c8-36f15b273c17",
-                        "full_name": "Lauren Bowles"
-                    }
-                ],
-                "writers": [
-                    {
-                        "uuid": "76f0b7e0-c058-4eb9-a2c7-a8b8a602e725",
-                        "full_name": "David Brant"
-                    }
-                ],
-                "directors": [
-                    {
-                        "uuid": "b1d26fd8-265a-42ff-a072-d28afba3c91f",
-                        "full_name": "Dave Schwep"
-                    }
+                "roles": [
+                    "actor"
                 ]
             }
         ]
@@ -1,5 +1,22 @@
+import hashlib
+import json
+
+# см. api/core/cache_keys.py
+CACHE_KEY_NAMESPACE = "url_cache"
+CACHE_KEY_VERSION = "v2"
+CACHE_KEY_DIGEST_SIZE = 32
+
+
 def get_cache_key(function_name: str, kwargs: dict):
-    cache_key = function_name + "="
+    """kwargs - параметры view (без зависимостей) в порядке сигнатуры."""
+    values = []
     for k, v in kwargs.items():
-        cache_key += "::" + str(k) + "::" + str(v)
-    return cache_key
\ No newline at end of file
+        if k in ("query", "prefix") and isinstance(v, str):
+            v = " ".join(v.split()).casefold()
+        if k == "fields" and isinstance(v, str):
+            v = ",".join(sorted({name.strip() for name in v.split(",") if name.strip()})) or None
+        values.append(v)
+    digest = hashlib.sha256(
+        json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode()
+    ).hexdigest()[:CACHE_KEY_DIGEST_SIZE]
+    return f"{CACHE_KEY_NAMESPACE}:{CACHE_KEY_VERSION}:{function_name}:{digest}"